@@ -0,0 +1,228 @@
+# app/admission.py
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from app import metrics
+from app.config import settings
+from app.profiling import span
+
+
+class Shed(Exception):
+    """Request rechazada por el control de admisión (se responde 503 + Retry-After)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Consume un token; devuelve 0 si lo había o los segundos hasta el próximo."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AdmissionController:
+    """
+    Admisión del camino de login (callback + aprovisionamiento), por worker:
+      1) token bucket por cliente (opt-in, ADMISSION_CLIENT_HEADER): un cliente que
+         reintenta en bucle no ocupa la cola de todos
+      2) límite de concurrencia adaptativo (AIMD): baja x0.75 si la latencia observada (EWMA)
+         supera el objetivo o el event loop va retrasado; sube +1 mientras esté saturado y sano
+      3) cola corta (FIFO) con timeout; con el worker congestionado no se encola: se rechaza ya
+
+    Todo corre en el event loop del worker: no hace falta lock.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int, queue_size: int,
+                 queue_timeout: float, client_rate: float, client_burst: int,
+                 target_latency: float, max_loop_lag: float, retry_after: int,
+                 max_clients: int = 100_000, adjust_interval: float = 1.0):
+        if client_rate <= 0:
+            # con rate 0 el bucket vacío no se recarga nunca: Retry-After infinito
+            raise RuntimeError(f"ADMISSION_CLIENT_RATE debe ser > 0 (es {client_rate})")
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = max(1, client_burst)
+        self.target_latency = target_latency
+        self.max_loop_lag = max_loop_lag
+        self.retry_after = max(1, retry_after)
+        self.max_clients = max_clients
+        self.adjust_interval = adjust_interval
+
+        self.limit = float(self.max_concurrency)
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self._adjusted_at = time.monotonic()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.admitted = 0
+        self.shed: Counter = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=settings.admission_max_concurrency,
+            min_concurrency=settings.admission_min_concurrency,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+            client_rate=settings.admission_client_rate,
+            client_burst=settings.admission_client_burst,
+            target_latency=settings.admission_target_latency_ms / 1000,
+            max_loop_lag=settings.admission_max_loop_lag_ms / 1000,
+            retry_after=settings.admission_retry_after_seconds,
+        )
+
+    # ── señales ──────────────────────────────────────────────────────────────
+    def congested(self) -> bool:
+        if metrics.event_loop_lag > self.max_loop_lag:
+            return True
+        return self.latency_ewma is not None and self.latency_ewma > self.target_latency
+
+    def _observe(self, latency: float) -> None:
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        now = time.monotonic()
+        if now - self._adjusted_at < self.adjust_interval:
+            return
+        self._adjusted_at = now
+        if self.congested():
+            self.limit = max(float(self.min_concurrency), self.limit * 0.75)
+        elif self.inflight >= int(self.limit) or self._waiters:  # saturado y sano
+            self.limit = min(float(self.max_concurrency), self.limit + 1)
+
+    def _check_client(self, client: str, now: float) -> None:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.client_burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take(self.client_rate, self.client_burst, now)
+        if wait:
+            raise Shed("client_rate", wait)
+
+    # ── slots ────────────────────────────────────────────────────────────────
+    async def acquire(self, client: Optional[str]) -> float:
+        """Reserva un slot (o lanza Shed). Devuelve el instante de inicio para release()."""
+        now = time.monotonic()
+        if client is not None:
+            self._check_client(client, now)
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return now
+        if self.congested():
+            raise Shed("overload", self.retry_after)
+        if len(self._waiters) >= self.queue_size:
+            raise Shed("queue_full", self.retry_after)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except BaseException as e:
+            # timeout o cliente desconectado: si el slot ya se le había cedido, devolverlo
+            self._discard(fut)
+            if fut.done() and not fut.cancelled():
+                self._release_slot()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Shed("queue_timeout", self.retry_after)
+            raise
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        self._observe(time.monotonic() - started)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        # el slot pasa directamente al primero de la cola (sin carrera con requests nuevas)
+        while self._waiters and self.inflight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    def _discard(self, fut: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued": len(self._waiters),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "event_loop_lag_ms": round(metrics.event_loop_lag * 1000, 1),
+            "clients": len(self._buckets),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+login_admission = AdmissionController.from_settings()
+
+
+def _client_key(request: Request) -> Optional[str]:
+    """
+    Cliente para el token bucket; None = sin límite por cliente. Solo con
+    ADMISSION_CLIENT_HEADER: detrás de un balanceador la IP del peer es la del
+    balanceador y todos los usuarios compartirían un bucket.
+    """
+    if not settings.admission_client_header:
+        return None
+    forwarded = request.headers.get(settings.admission_client_header)
+    if forwarded:
+        return forwarded.split(",")[0].strip()  # primer salto = cliente original
+    return request.client.host if request.client else "unknown"
+
+
+async def admit_login(request: Request) -> AsyncIterator[None]:
+    """
+    Dependencia del callback de Google:
+      @router.get("/google/callback", dependencies=[Depends(admit_login)])
+    Rechaza con 503 + Retry-After en vez de dejar que los logins se acumulen sobre
+    Firebase Auth/Firestore (mejor unos rápidos que todos lentos).
+    """
+    if not settings.admission_enabled:
+        yield
+        return
+    controller = login_admission
+    try:
+        with span("admission.wait"):
+            started = await controller.acquire(_client_key(request))
+    except Shed as e:
+        controller.shed[e.reason] += 1
+        metrics.ADMISSION_SHED.labels(e.reason).inc()
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "overloaded", "reason": e.reason},
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    try:
+        yield
+    finally:
+        controller.release(started)
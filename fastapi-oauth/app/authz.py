@@ -2,8 +2,9 @@
 from enum import Enum
 from fastapi import HTTPException, Depends, status
 from typing import Iterable, List, Optional
-from app.schemas import AuthUser
-from app.deps import current_user
+from app.config import settings
+from app.schemas import AuthUser, roles_to_mask
+from app.deps import current_user, current_user_from_claims
 
 class Role(str, Enum):
     HR_ADMIN = "HR_ADMIN"
@@ -21,10 +22,12 @@ def require_roles(*allowed: Role):
     o:
       def endpoint(user=Depends(require_roles(Role.MANAGER, Role.HR_ADMIN))):
           ...
+    Con AUTHZ_TRUST_CLAIMS=true se autoriza solo desde el JWT (sin Firestore).
     """
-    allowed_str = [r.value if isinstance(r, Role) else str(r) for r in allowed]
-    def _inner(user: AuthUser = Depends(current_user)) -> AuthUser:
-        if not has_any_role(user.roles, allowed_str):
+    allowed_mask = roles_to_mask(allowed)  # precalculado una vez por dependencia
+    user_dep = current_user_from_claims if settings.authz_trust_claims else current_user
+    def _inner(user: AuthUser = Depends(user_dep)) -> AuthUser:
+        if not user.role_mask & allowed_mask:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insuficientes permisos")
         return user
     return _inner
@@ -38,12 +41,12 @@ def require_self_or_roles(owner_id_param: str, *allowed: Role):
       def get_timesheet(empId: str, user=Depends(require_self_or_roles("empId", Role.MANAGER, Role.HR_ADMIN))):
           ...
     """
-    allowed_str = [r.value if isinstance(r, Role) else str(r) for r in allowed]
+    allowed_mask = roles_to_mask(allowed)  # mismo chequeo por bitmask que require_roles
     def _inner(user: AuthUser = Depends(current_user), **kwargs) -> AuthUser:
         owner = kwargs.get(owner_id_param)
         if owner and owner == user.uid:
             return user
-        if has_any_role(user.roles, allowed_str):
+        if user.role_mask & allowed_mask:
             return user
         raise HTTPException(status_code=403, detail="Insuficientes permisos")
     return _inner
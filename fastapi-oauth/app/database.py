@@ -0,0 +1,52 @@
+# app/database.py
+from typing import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+
+from app.config import settings
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+_engine: Engine | None = None
+SessionLocal = sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def get_engine() -> Engine:
+    """Engine con pool de conexiones, creado una sola vez por proceso."""
+    global _engine
+    if _engine is None:
+        url = settings.database_url
+        if url.startswith("sqlite"):
+            # SQLite: sin QueuePool tuning; check_same_thread=False porque usamos pools de hilos
+            _engine = create_engine(url, connect_args={"check_same_thread": False})
+        else:
+            _engine = create_engine(
+                url,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_recycle=settings.db_pool_recycle_seconds,
+                pool_pre_ping=True,
+            )
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def init_db() -> None:
+    """Crea las tablas propias del servicio (no toca las de sakila existentes)."""
+    import app.models  # noqa: F401  (registra los modelos en Base.metadata)
+
+    Base.metadata.create_all(get_engine())
+
+
+def get_db() -> Iterator[Session]:
+    get_engine()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
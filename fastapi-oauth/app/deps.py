@@ -1,28 +1,138 @@
 # app/deps.py
+import hashlib
+import time
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from jose import JWTError
+from app.cache import TTLCache
+from app.shared_cache import make_cache
 from app.config import settings
-from app.schemas import AuthUser
-from app.repos.users_repo import get_user_doc
+from app.etag import user_etag
+from app.metrics import register_cache
+from app.revocation import revocations
+from app.schemas import AuthUser, mask_to_roles, roles_to_mask
+from app.security import decode_access_token
+from app.repos.users_repo import get_user_doc, peek_user_doc
 
 security = HTTPBearer(auto_error=False)
 
+# Cache de principales ya verificados: sha256(token) -> AuthUser
+# Evita jwt.decode + lectura de Firestore en cada request autenticada.
+# Con SHARED_CACHE=true la comparten todos los workers.
+principal_cache = make_cache(
+    "principal",
+    max_size=settings.principal_cache_max_size,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+    encode=lambda user: user.model_dump(),
+    decode=lambda data: AuthUser(**data),
+)
+
+# Principales construidos solo desde claims (modo AUTHZ_TRUST_CLAIMS): sha256(token) -> (AuthUser, rv)
+claims_cache = TTLCache(
+    max_size=settings.principal_cache_max_size,
+    ttl_seconds=settings.jwt_expires_minutes * 60,
+)
+
+register_cache("principal", principal_cache.stats)
+register_cache("claims", claims_cache.stats)
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _user_from_doc(uid: str, doc: dict, payload: dict) -> AuthUser:
+    roles = doc.get("roles", [])
+    return AuthUser(uid=uid, email=doc.get("email"), roles=roles, role_mask=roles_to_mask(roles),
+                    etag=user_etag(doc), **_token_ids(payload))
+
+def _issued_ms(payload: dict) -> int:
+    # tokens anteriores a 'iat_ms': inicio de su segundo (ante la duda, revocado)
+    return int(payload.get("iat_ms") or int(payload.get("iat") or 0) * 1000)
+
+def _token_ids(payload: dict) -> dict:
+    return {"jti": payload.get("jti"), "iat_ms": _issued_ms(payload), "exp": payload.get("exp")}
+
+def _ensure_not_revoked(user: AuthUser) -> AuthUser:
+    # Deny-list en memoria (jti / not-before por uid): O(1), sin Firestore
+    if revocations.is_revoked(user.uid, user.jti, user.iat_ms):
+        raise HTTPException(status_code=401, detail="Token revocado")
+    return user
+
 def current_user(creds: HTTPAuthorizationCredentials = Depends(security)) -> AuthUser:
     if creds is None or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Falta token Bearer")
 
     token = creds.credentials
+    key = _token_key(token) if settings.principal_cache_enabled else None
+    if key:
+        cached = principal_cache.get(key)
+        if cached is not None:
+            return _ensure_not_revoked(cached)
+
     try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        payload = decode_access_token(token)
         uid = str(payload.get("sub"))
         if not uid:
             raise HTTPException(status_code=401, detail="Token sin 'sub'")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+    if revocations.is_revoked(uid, payload.get("jti"), _issued_ms(payload)):
+        raise HTTPException(status_code=401, detail="Token revocado")
+
     doc = get_user_doc(uid)
     if not doc or not doc.get("active", True):
         raise HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
 
-    return AuthUser(uid=uid, email=doc.get("email"), roles=doc.get("roles", []))
+    user = _user_from_doc(uid, doc, payload)
+    if key:
+        # El TTL nunca supera la expiración del propio token
+        exp = payload.get("exp")
+        ttl = (float(exp) - time.time()) if exp else None
+        principal_cache.set(key, user, ttl=ttl)
+    return user
+
+
+def current_user_from_claims(creds: HTTPAuthorizationCredentials = Depends(security)) -> AuthUser:
+    """
+    Autoriza solo con el JWT (bitmask 'rm' + versión 'rv'), sin leer Firestore.
+    Si la cache local de usuarios ya vio un cambio de roles posterior al token
+    (roles_version > rv) o el usuario fue desactivado, se usa el doc actual.
+    Tokens sin claims de roles caen a current_user.
+    """
+    if creds is None or creds.scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Falta token Bearer")
+
+    token = creds.credentials
+    key = _token_key(token)
+    entry = claims_cache.get(key)
+    if entry is None:
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Token inválido")
+        uid = payload.get("sub")
+        if not uid:
+            raise HTTPException(status_code=401, detail="Token sin 'sub'")
+        mask = payload.get("rm")
+        if mask is None:
+            if "roles" not in payload:
+                return current_user(creds)
+            mask = roles_to_mask(payload["roles"])
+        user = AuthUser(uid=str(uid), email=payload.get("email"), roles=mask_to_roles(mask), role_mask=mask,
+                        **_token_ids(payload))
+        entry = (user, int(payload.get("rv", 0)))
+        exp = payload.get("exp")
+        claims_cache.set(key, entry, ttl=(float(exp) - time.time()) if exp else None)
+
+    user, rv = entry
+    _ensure_not_revoked(user)
+    doc = peek_user_doc(user.uid)
+    if doc is not None:
+        if not doc.get("active", True):
+            raise HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
+        if int(doc.get("roles_version", 0)) > rv:
+            fresh = get_user_doc(user.uid)
+            if not fresh or not fresh.get("active", True):
+                raise HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
+            return _user_from_doc(user.uid, fresh, {"jti": user.jti, "iat_ms": user.iat_ms, "exp": user.exp})
+    return user
@@ -0,0 +1,33 @@
+# app/etag.py
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+from app.schemas import roles_to_mask
+
+# Respuestas por usuario: cualquier cache intermedia debe separar por token
+# y revalidar siempre (no-cache = guardar, pero preguntar con If-None-Match).
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def user_etag(doc: Dict[str, Any]) -> str:
+    """
+    ETag débil de la representación de un usuario: cambia con updated_at (perfil,
+    roles), con los roles (bitmask) y con active. last_login no participa.
+    """
+    active = 1 if doc.get("active", True) else 0
+    return f'W/"{doc.get("updated_at") or 0}-{roles_to_mask(doc.get("roles"))}-{active}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110 §13.1.2): ignora el prefijo W/ en ambos lados."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
@@ -0,0 +1,52 @@
+# app/executor.py
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config import settings
+
+# Un pool acotado por backend: una ráfaga de logins contra Firebase Auth
+# no puede acaparar los hilos que usa Firestore (ni el threadpool de Starlette).
+_POOL_SIZES: Dict[str, int] = {
+    "firebase_auth": settings.firebase_auth_max_workers,
+    "firestore": settings.firestore_max_workers,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _executor(backend: str) -> ThreadPoolExecutor:
+    ex = _executors.get(backend)
+    if ex is None:
+        with _lock:
+            ex = _executors.get(backend)
+            if ex is None:
+                ex = ThreadPoolExecutor(
+                    max_workers=max(1, _POOL_SIZES.get(backend, 4)),
+                    thread_name_prefix=f"{backend}-io",
+                )
+                _executors[backend] = ex
+    return ex
+
+
+async def run_blocking(backend: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta una llamada síncrona (Firebase Admin / Firestore) fuera del event loop.
+    Uso:
+      doc = await run_blocking("firestore", get_user_doc, uid)
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_executor(backend), call)
+
+
+def shutdown_executors() -> None:
+    with _lock:
+        for ex in _executors.values():
+            ex.shutdown(wait=True, cancel_futures=False)
+        _executors.clear()
@@ -1,15 +1,36 @@
 # app/firebase.py
 import os
+import threading
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, auth as fb_auth, firestore
 from .config import settings
 
+# firebase_admin (google-cloud-firestore + grpc) se importa en init_firebase(),
+# no al cargar el módulo: el arranque en frío no paga ese import (lo hace el warm-up).
 firebase_app = None
 firestore_client = None
+fb_auth = None
+
+_init_lock = threading.Lock()
+
+
+def _initialized() -> bool:
+    return firebase_app is not None and (firestore_client is not None or not settings.use_firestore)
+
 
 def init_firebase():
-    global firebase_app, firestore_client
+    # Ya inicializado (o con clientes inyectados vía override_clients): sin lock
+    if _initialized():
+        return
+    # Warm-up del lifespan, requests y el sync de revocaciones pueden llegar a la vez;
+    # initialize_app lanza ValueError si la app por defecto ya existe => double-checked init
+    with _init_lock:
+        if _initialized():
+            return
+        _init_locked()
+
+
+def _init_locked():
+    global firebase_app, firestore_client, fb_auth
 
     # ✅ Resolver ruta absoluta aunque en settings sea relativa
     cred_path = Path(settings.firebase_credentials_path).expanduser().resolve()
@@ -20,6 +41,12 @@ def init_firebase():
             f"Tip: coloca el archivo ahí o ajusta FIREBASE_CREDENTIALS_PATH en .env"
         )
 
+    import firebase_admin
+    from firebase_admin import auth, credentials, firestore
+
+    if fb_auth is None:
+        fb_auth = auth
+
     if firebase_app is None:
         cred = credentials.Certificate(str(cred_path))
         firebase_app = firebase_admin.initialize_app(cred, {
@@ -30,9 +57,28 @@ def init_firebase():
         firestore_client = firestore.client(app=firebase_app)
 
 
+def override_clients(firestore=None, auth=None):
+    """
+    Inyecta clientes alternativos (fakes en memoria para benchmarks/pruebas offline)
+    en lugar de los del SDK. Marca Firebase como inicializado para no leer credenciales.
+    """
+    global firebase_app, firestore_client, fb_auth
+    with _init_lock:
+        if firebase_app is None:
+            firebase_app = object()
+        if firestore is not None:
+            firestore_client = firestore
+        if auth is not None:
+            fb_auth = auth
+
+
 def get_auth():
+    global fb_auth
     if firebase_app is None:
         init_firebase()
+    if fb_auth is None:
+        from firebase_admin import auth
+        fb_auth = auth
     return fb_auth
 
 
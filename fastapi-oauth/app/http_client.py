@@ -0,0 +1,128 @@
+# app/http_client.py
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte con pool propio, compartido por todos los clientes httpx del proceso.
+    Authlib abre y cierra un AsyncOAuth2Client por llamada: aquí aclose() no hace nada,
+    así el pool (conexiones keep-alive y sesiones TLS) sobrevive entre logins.
+    El cierre real es close(), en el shutdown del lifespan.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+        self.counts: Counter = Counter()
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        # Eventos de httpcore: una conexión nueva emite connect_tcp (+ start_tls si es https)
+        if event.endswith("connect_tcp.complete"):
+            self.counts["connections_opened"] += 1
+        elif event.endswith("start_tls.complete"):
+            self.counts["tls_handshakes"] += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counts["requests"] += 1
+        outer = request.extensions.get("trace")
+        if outer is None:
+            request.extensions["trace"] = self._trace
+        else:
+            async def chained(event: str, info: Dict[str, Any]) -> None:
+                await self._trace(event, info)
+                await outer(event, info)
+            request.extensions["trace"] = chained
+        response = await self._inner.handle_async_request(request)
+        version = response.extensions.get("http_version")
+        self.counts[version.decode() if version else "other"] += 1
+        return response
+
+    async def aclose(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.counts)
+        requests = out.get("requests", 0)
+        opened = out.get("connections_opened", 0)
+        out["reuse_ratio"] = round(1 - opened / requests, 4) if requests else 0.0
+        conns = getattr(getattr(self._inner, "_pool", None), "connections", None)
+        if conns is not None:
+            out["pool_connections"] = len(conns)
+            out["pool_idle"] = sum(1 for c in conns if c.is_idle())
+        return out
+
+
+_transport: Optional[SharedTransport] = None
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (extra httpx[http2])
+    except ImportError:
+        return False
+    return True
+
+
+def timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.outbound_timeout_seconds, connect=settings.outbound_connect_timeout)
+
+
+def start(inner: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Crea (una vez) el cliente saliente del proceso. `inner` permite sustituir la red
+    (p.ej. el StubOIDCProvider de bench/ vía ASGITransport).
+    """
+    global _transport, _client
+    if _client is not None:
+        return _client
+    if inner is None:
+        http2 = settings.outbound_http2 and _http2_available()
+        if settings.outbound_http2 and not http2:
+            logger.warning("OUTBOUND_HTTP2=true but 'h2' is missing (pip install httpx[http2]); using HTTP/1.1")
+        inner = httpx.AsyncHTTPTransport(
+            http2=http2,
+            retries=1,  # solo reintenta fallos de conexión, nunca un POST ya enviado
+            limits=httpx.Limits(
+                max_connections=settings.outbound_max_connections,
+                max_keepalive_connections=settings.outbound_max_keepalive,
+                keepalive_expiry=settings.outbound_keepalive_expiry,
+            ),
+        )
+    _transport = SharedTransport(inner)
+    _client = httpx.AsyncClient(transport=_transport, timeout=timeout())
+    return _client
+
+
+def get_client() -> Optional[httpx.AsyncClient]:
+    return _client
+
+
+def oauth_client_kwargs() -> Dict[str, Any]:
+    """kwargs para los clientes Authlib (OAuth.register / client_kwargs): comparten el pool."""
+    if _transport is None:
+        return {}
+    return {"transport": _transport, "timeout": timeout()}
+
+
+async def stop() -> None:
+    global _transport, _client
+    if _client is not None:
+        await _client.aclose()
+    if _transport is not None:
+        await _transport.close()
+    _transport, _client = None, None
+
+
+def stats() -> Dict[str, Any]:
+    return _transport.stats() if _transport is not None else {}
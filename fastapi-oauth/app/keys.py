@@ -0,0 +1,111 @@
+# app/keys.py
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.config import settings
+
+
+@dataclass
+class SigningKey:
+    kid: str
+    alg: str
+    verify_key: Key
+    sign_key: Optional[Key] = None  # None => clave retirada, solo verifica
+    public_jwk: Optional[Dict[str, Any]] = field(default=None)
+
+
+def _alg_for_pem(pem: str) -> str:
+    # RSA => RS256, EC => ES256 (python-jose no soporta EdDSA)
+    return "ES256" if _is_ec(pem) else "RS256"
+
+
+def _is_ec(pem: str) -> bool:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    data = pem.encode()
+    try:
+        k = serialization.load_pem_private_key(data, password=None)
+    except (ValueError, TypeError):
+        k = serialization.load_pem_public_key(data)
+    return isinstance(k, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey))
+
+
+class KeyRing:
+    """
+    Llaves de firma de JWT precargadas como objetos jose (no se re-parsean por request).
+    Cada token lleva 'kid' en la cabecera; la verificación busca la llave por kid,
+    así se puede rotar publicando la nueva llave antes de activarla.
+    """
+
+    def __init__(self) -> None:
+        self.keys: Dict[str, SigningKey] = {}
+        self.active_kid: Optional[str] = None
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.active_kid is not None and self.keys[self.active_kid].alg != "HS256"
+
+    def add_pem(self, kid: str, pem: str, private: bool = True) -> SigningKey:
+        alg = _alg_for_pem(pem)
+        if private:
+            sign_key = jwk.construct(pem, alg)
+            verify_key = sign_key.public_key()
+        else:
+            sign_key, verify_key = None, jwk.construct(pem, alg)
+        public_jwk = {**verify_key.to_dict(), "kid": kid, "use": "sig", "alg": alg}
+        key = SigningKey(kid=kid, alg=alg, verify_key=verify_key, sign_key=sign_key, public_jwk=public_jwk)
+        self.keys[kid] = key
+        return key
+
+    def add_secret(self, kid: str, secret: str, alg: str = "HS256") -> SigningKey:
+        k = jwk.construct(secret, alg)
+        key = SigningKey(kid=kid, alg=alg, verify_key=k, sign_key=k)
+        self.keys[kid] = key
+        return key
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        ring = cls()
+        keys_dir = settings.jwt_keys_dir
+        if keys_dir:
+            for path in sorted(Path(keys_dir).expanduser().glob("*.pem")):
+                public_only = path.name.endswith(".pub.pem")
+                kid = path.name[: -len(".pub.pem")] if public_only else path.stem
+                ring.add_pem(kid, path.read_text(), private=not public_only)
+            signers = [k for k, v in ring.keys.items() if v.sign_key is not None]
+            if not signers:
+                raise RuntimeError(f"JWT_KEYS_DIR sin llaves privadas: {keys_dir}")
+            ring.active_kid = settings.jwt_active_kid or signers[-1]
+        else:
+            ring.add_secret("default", settings.jwt_secret, settings.jwt_algorithm)
+            ring.active_kid = "default"
+        if ring.active_kid not in ring.keys or ring.keys[ring.active_kid].sign_key is None:
+            raise RuntimeError(f"JWT_ACTIVE_KID sin llave privada: {ring.active_kid}")
+        return ring
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        key = self.keys[self.active_kid]
+        headers = {"kid": key.kid} if self.asymmetric else None
+        return jwt.encode(claims, key.sign_key, algorithm=key.alg, headers=headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verifica firma y exp. Lanza jose.JWTError si el token no es válido."""
+        if self.asymmetric:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self.keys.get(kid)
+            if key is None:
+                raise JWTError(f"kid desconocido: {kid}")
+        else:
+            key = self.keys[self.active_kid]
+        return jwt.decode(token, key.verify_key, algorithms=[key.alg])
+
+    def jwks(self) -> Dict[str, Any]:
+        return {"keys": [k.public_jwk for k in self.keys.values() if k.public_jwk]}
+
+
+key_ring = KeyRing.from_settings()
@@ -1,26 +1,159 @@
 # app/main.py
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Any, Callable, Dict, Optional
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
 from app.config import settings
-from app.firebase import init_firebase  # si usas Firebase Admin como te propuse
+from app.firebase import get_firestore, init_firebase  # firebase_admin se importa en el warm-up
 from app.routers import auth as auth_router
 from app.routers import auth_roles
+from app.routers import users as users_router
+from app.routers import profiling as profiling_router
+from app.repos.users_repo import (
+    start_users_listener,
+    stop_users_listener,
+    load_bootstrap_flag,
+    flush_login_touches,
+)
+from app.repos.write_behind import flush_periodically
+from app.revocation import sync_periodically, sync_revocations
+from app.executor import run_blocking, shutdown_executors
+from app.oidc import google_oidc
+from app.keys import key_ring
+from app.security import create_access_token, decode_access_token
+from app import http_client, metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Warm-up y readiness
+# ──────────────────────────────────────────────────────────────────────────────
+# El proceso acepta conexiones en cuanto carga la app (imports ligeros); los SDKs pesados
+# (firebase_admin/grpc, Authlib) y las precargas se hacen en _warm_up() en segundo plano.
+# /health = vivo; /ready = calentado (lo que debe consultar el balanceador/autoscaler).
+# Paso -> "pending" | "ok" | "skipped" | "failed: <error>"
+readiness: Dict[str, str] = {}
+# Sin estos pasos no se puede atender un login/verificación correctamente
+_REQUIRED_STEPS = ("users_backend", "revocations", "crypto")
+
+
+async def _step(name: str, fn: Callable[[], Any], backend: Optional[str] = "firestore") -> bool:
+    readiness[name] = "pending"
+    started = time.perf_counter()
+    try:
+        result = fn() if backend is None else await run_blocking(backend, fn)
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        # Evita crashear el servidor por fallos en secretos/red: queda en /ready
+        readiness[name] = f"failed: {e}"
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        return False
+    readiness[name] = "ok"
+    logger.info("Warm-up step %s: %.1f ms", name, (time.perf_counter() - started) * 1000)
+    return True
+
+
+def _init_users_backend() -> None:
+    # 🔹 Backend SQL: crea las tablas propias si faltan (staff_role, oauth_account)
+    if settings.users_backend == "sql":
+        from app.database import init_db
+        init_db()
+    elif get_firestore() is None:
+        raise RuntimeError("Firestore deshabilitado (USE_FIRESTORE=false)")
+
+
+def _warm_crypto() -> None:
+    # Primera firma/verificación: carga los backends de jose/cryptography fuera del primer login
+    decode_access_token(create_access_token({"sub": "warm-up"}, expires_minutes=1))
+
+
+async def _warm_google(outbound) -> None:
+    # Authlib se importa aquí; el cliente ya nace con el transporte compartido
+    if not await _step("oauth_client", auth_router.google_client, backend=None):
+        return
+    # 🔹 Discovery + JWKS de Google precargados (y refrescados en segundo plano)
+    if not settings.oidc_prefetch:
+        readiness["oidc"] = "skipped"
+        return
+    await _step("oidc", lambda: google_oidc.start(auth_router.google_client(), client=outbound), backend=None)
+
+
+async def _warm_backends() -> None:
+    # 🔹 Firebase Admin (import de firebase_admin/grpc + credenciales) en su pool
+    await _step("firebase", init_firebase, backend="firebase_auth")
+    await _step("users_backend", _init_users_backend)
+    # 🔹 Deny-list de tokens revocados: carga inicial (eventos aún vigentes) antes de estar listos
+    await _step("revocations", sync_revocations)
+    # 🔹 Flag de bootstrap del HR_ADMIN inicial (evita leer metadatos en cada signup)
+    await _step("bootstrap_flag", load_bootstrap_flag)
+    # 🔹 Invalidación de la cache de usuarios por cambios de otras réplicas
+    await _step("users_listener", start_users_listener)
+
+
+async def _warm_up(outbound) -> None:
+    started = time.perf_counter()
+    await asyncio.gather(
+        _step("crypto", _warm_crypto, backend=None),
+        _warm_backends(),
+        _warm_google(outbound),
+    )
+    logger.info("Warm-up finished in %.1f ms (ready=%s)", (time.perf_counter() - started) * 1000, is_ready())
+
+
+def is_ready() -> bool:
+    if not readiness or any(v == "pending" for v in readiness.values()):
+        return False
+    return all(readiness.get(step) == "ok" for step in _REQUIRED_STEPS)
+
 
 # Lifespan: inicializa servicios (Firebase, etc.)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 🔹 Inicializa Firebase una vez al arrancar
-    try:
-        init_firebase()
-    except Exception as e:
-        # Evita crashear el servidor por fallos en secretos; loguéalo si tienes logger
-        print(f"[WARN] Firebase init skipped/failed: {e}")
+    # 🔹 Cliente HTTP saliente compartido: token/userinfo/discovery reutilizan conexiones (keep-alive, HTTP/2)
+    outbound = http_client.start()
+    # 🔹 SDKs pesados y precargas: en segundo plano, /ready informa cuando terminan
+    readiness.clear()
+    readiness.update({step: "pending" for step in _REQUIRED_STEPS})
+    warm_up = asyncio.create_task(_warm_up(outbound))
+    # 🔹 Write-behind de last_login (lotes periódicos)
+    flusher = asyncio.create_task(flush_periodically(
+        lambda: run_blocking("firestore", flush_login_touches),
+        settings.login_touch_flush_seconds,
+    ))
+    # 🔹 Sincronización incremental de revocaciones (cursor por created_at)
+    revocation_sync = asyncio.create_task(sync_periodically(
+        lambda: run_blocking("firestore", sync_revocations),
+        settings.revocation_sync_seconds,
+    ))
+    background = [warm_up, flusher, revocation_sync]
+    # 🔹 Lag del event loop (gauge Prometheus y señal del control de admisión)
+    if settings.metrics_enabled or settings.admission_enabled:
+        background.append(asyncio.create_task(metrics.monitor_event_loop_lag()))
     yield
     # 🔹 Cierre/limpieza si hicieras conexiones persistentes (DB, clientes, etc.)
+    for task in background:
+        task.cancel()
+    for task in background:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    try:
+        flush_login_touches()  # no perder last_login pendientes en un apagado limpio
+    except Exception as e:
+        logger.warning("Final write-behind flush failed: %s", e)
+    await google_oidc.stop()
+    await http_client.stop()
+    stop_users_listener()
+    shutdown_executors()
 
 
 app = FastAPI(
@@ -45,6 +178,17 @@ app.add_middleware(
 )
 
 
+# ✅ Métricas Prometheus: latencia por plantilla de ruta (ASGI puro, bajo overhead)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+# ✅ Profiler opt-in (PROFILING_ENABLED): spans por fase + stacks de las requests lentas/muestreadas.
+#    Desactivado no se registra: cero overhead por request.
+if settings.profiling_enabled:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+
 # ✅ CORS
 allowed_origins = settings.cors_origins or ["http://localhost:3000", "http://127.0.0.1:3000"]
 app.add_middleware(
@@ -60,7 +204,8 @@ app.add_middleware(
 # Si tu router ya define prefix internamente, déjalo así;
 # si no, puedes darle un prefix aquí:
 app.include_router(auth_router.router, tags=["auth"])
-# app.include_router(users_router.router, tags=["users"])  # si aplica
+app.include_router(users_router.router)
+app.include_router(profiling_router.router)
 
 app.include_router(auth_roles.router)
 
@@ -68,3 +213,21 @@ app.include_router(auth_roles.router)
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+# ✅ Readiness: 200 cuando el warm-up terminó (SDKs cargados, deny-list y OIDC precargados)
+@app.get("/ready")
+def ready():
+    status_code = 200 if is_ready() else 503
+    return JSONResponse({"ready": status_code == 200, "checks": dict(readiness)}, status_code=status_code)
+
+# ✅ Prometheus
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+# ✅ JWKS público: otros servicios verifican nuestros JWT localmente (sin llamar a /auth/me)
+@app.get("/.well-known/jwks.json")
+def jwks(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks()
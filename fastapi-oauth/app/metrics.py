@@ -0,0 +1,141 @@
+# app/metrics.py
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from app.config import settings
+from app.profiling import current_trace
+
+# Cardinalidad acotada: 'route' es la plantilla de la ruta (no el path real),
+# 'status' es la clase (2xx, 4xx...) y dependency/op son un conjunto fijo del código.
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_call_duration_seconds",
+    "Latencia por llamada a cada backend (JWT, Firestore/SQL, Firebase Auth, Google)",
+    ["dependency", "op", "outcome"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "Retraso observado del event loop",
+                       multiprocess_mode="max")
+ADMISSION_SHED = Counter(
+    "admission_shed_total",
+    "Callbacks de login rechazados con 503 por el control de admisión",
+    ["reason"],  # client_rate | overload | queue_full | queue_timeout
+)
+OIDC_USERINFO_FALLBACK = Counter(
+    "oidc_userinfo_fallback_total",
+    "Logins que necesitaron llamar al endpoint userinfo de Google",
+    ["reason"],  # no_id_token | missing_claims
+)
+
+
+@contextmanager
+def timed(dependency: str, op: str) -> Iterator[None]:
+    """
+    Uso:
+      with timed("firestore", "get_doc"):
+          ...
+    """
+    trace = current_trace()  # profiler opt-in (app/profiling.py): la llamada queda como span
+    if not settings.metrics_enabled and trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        if trace is None:
+            yield
+        else:
+            with trace.span(f"{dependency}.{op}"):
+                yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        if settings.metrics_enabled:
+            DEPENDENCY_LATENCY.labels(dependency, op, outcome).observe(time.perf_counter() - t0)
+
+
+# ── Ratios de acierto de caches (se leen al hacer scrape) ────────────────────
+_caches: Dict[str, Callable[[], dict]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    _caches[name] = stats
+
+
+class _CacheCollector:
+    def collect(self):
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hit ratio por cache en proceso", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entradas por cache en proceso", labels=["cache"])
+        for name, stats in list(_caches.items()):
+            s = stats()
+            ratio.add_metric([name], s.get("hit_ratio", 0.0))
+            size.add_metric([name], s.get("size", 0))
+        yield ratio
+        yield size
+
+
+_cache_collector = _CacheCollector()
+REGISTRY.register(_cache_collector)
+
+
+# ── Middleware ASGI (sin BaseHTTPMiddleware: menos overhead por request) ──────
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                f"{status['code'] // 100}xx",
+            ).observe(time.perf_counter() - t0)
+
+
+# Último lag medido; también lo consulta el control de admisión (app/admission.py)
+event_loop_lag = 0.0
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    global event_loop_lag
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        event_loop_lag = max(0.0, time.perf_counter() - t0 - interval)
+        EVENT_LOOP_LAG.set(event_loop_lag)
+
+
+def render_latest() -> tuple[bytes, str]:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # gunicorn multi-worker: agrega los archivos de todos los workers
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_cache_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from sqlalchemy import (
-    String, Integer, SmallInteger, ForeignKey, Boolean, DateTime
+    String, Integer, SmallInteger, BigInteger, ForeignKey, Boolean, DateTime, UniqueConstraint
 )
 from sqlalchemy.dialects.mysql import BLOB
 from sqlalchemy.sql import func
@@ -14,7 +14,10 @@ from app.database import Base
 class Staff(Base):
     __tablename__ = "staff"
 
-    staff_id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=True)
+    # SQLite solo autoincrementa INTEGER PRIMARY KEY (benchmarks locales)
+    staff_id: Mapped[int] = mapped_column(
+        SmallInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
     first_name: Mapped[str] = mapped_column(String(45), nullable=False)
     last_name: Mapped[str] = mapped_column(String(45), nullable=False)
     email: Mapped[str | None] = mapped_column(String(50))
@@ -33,10 +36,15 @@ class Staff(Base):
     oauth_accounts: Mapped[list["OAuthAccount"]] = relationship(
         "OAuthAccount", back_populates="staff", cascade="all, delete-orphan"
     )
+    roles: Mapped[list["StaffRole"]] = relationship(
+        "StaffRole", back_populates="staff", cascade="all, delete-orphan"
+    )
 
 
 class OAuthAccount(Base):
     __tablename__ = "oauth_account"
+    # Un login = lookup por (provider, provider_sub): índice único
+    __table_args__ = (UniqueConstraint("provider", "provider_sub", name="uq_oauth_provider_sub"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     provider: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -45,5 +53,16 @@ class OAuthAccount(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.current_timestamp(), nullable=False
     )
+    last_login: Mapped[datetime | None] = mapped_column(DateTime)
+    roles_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
 
     staff: Mapped[Staff] = relationship("Staff", back_populates="oauth_accounts")
+
+
+class StaffRole(Base):
+    __tablename__ = "staff_role"
+
+    staff_id: Mapped[int] = mapped_column(SmallInteger, ForeignKey("staff.staff_id"), primary_key=True)
+    role: Mapped[str] = mapped_column(String(20), primary_key=True)
+
+    staff: Mapped[Staff] = relationship("Staff", back_populates="roles")
@@ -0,0 +1,134 @@
+# app/oidc.py
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _max_age(resp: httpx.Response, default: int) -> int:
+    m = _MAX_AGE_RE.search(resp.headers.get("cache-control", ""))
+    return int(m.group(1)) if m else default
+
+
+class OIDCMetadataCache:
+    """
+    Discovery + JWKS de un proveedor OIDC, precargados en lifespan y refrescados
+    en segundo plano según Cache-Control. Si un refresco falla se mantiene la
+    última copia buena (last known-good) y se reintenta antes.
+    """
+
+    def __init__(self, discovery_url: str, min_refresh: int = 60, max_refresh: int = 86400,
+                 retry_seconds: int = 30):
+        self.discovery_url = discovery_url
+        self.min_refresh = min_refresh
+        self.max_refresh = max_refresh
+        self.retry_seconds = retry_seconds
+        self.metadata: Optional[Dict[str, Any]] = None
+        self.jwks: Optional[Dict[str, Any]] = None
+        self.loaded_at: Optional[float] = None
+        self.refresh_failures = 0
+        self._next_refresh = 0.0
+        self._apps: list = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._own_client = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _clamp(self, seconds: int) -> int:
+        return max(self.min_refresh, min(self.max_refresh, seconds))
+
+    async def refresh(self) -> None:
+        """Descarga discovery y JWKS; solo reemplaza la copia local si ambos son válidos."""
+        client = self._client
+        resp = await client.get(self.discovery_url)
+        resp.raise_for_status()
+        metadata = resp.json()
+        ttl = self._clamp(_max_age(resp, self.max_refresh))
+
+        jwks = None
+        if metadata.get("jwks_uri"):
+            jresp = await client.get(metadata["jwks_uri"])
+            jresp.raise_for_status()
+            jwks = jresp.json()
+            if not jwks.get("keys"):
+                raise ValueError("JWKS sin 'keys'")
+            ttl = min(ttl, self._clamp(_max_age(jresp, self.max_refresh)))
+
+        self.metadata, self.jwks = metadata, jwks
+        self.loaded_at = time.time()
+        self._next_refresh = time.monotonic() + ttl
+        for oauth_app in self._apps:
+            self.apply(oauth_app)
+
+    def apply(self, oauth_app) -> None:
+        """
+        Inyecta la copia en un cliente Authlib: con '_loaded_at' y 'jwks' presentes
+        load_server_metadata() y fetch_jwk_set() ya no salen a la red.
+        """
+        if self.metadata is None:
+            return
+        oauth_app.server_metadata.update(self.metadata)
+        if self.jwks:
+            oauth_app.server_metadata["jwks"] = self.jwks
+        oauth_app.server_metadata["_loaded_at"] = self.loaded_at
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self._next_refresh - time.monotonic()))
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_failures += 1
+                self._next_refresh = time.monotonic() + self.retry_seconds
+                logger.warning("OIDC metadata refresh failed (keeping last known-good): %s", e)
+
+    async def start(self, oauth_app=None, client: Optional[httpx.AsyncClient] = None) -> None:
+        if oauth_app is not None and oauth_app not in self._apps:
+            self._apps.append(oauth_app)
+        if client is None and self._client is None:
+            client, self._own_client = httpx.AsyncClient(timeout=10.0), True
+        self._client = client or self._client
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.refresh_failures += 1
+            self._next_refresh = time.monotonic() + self.retry_seconds
+            logger.warning("OIDC metadata prefetch failed (lazy fetch on first login): %s", e)
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._own_client and self._client is not None:
+            await self._client.aclose()
+        self._client, self._own_client = None, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.metadata is not None,
+            "loaded_at": self.loaded_at,
+            "jwks_keys": len((self.jwks or {}).get("keys", [])),
+            "refresh_failures": self.refresh_failures,
+            "next_refresh_in": max(0.0, self._next_refresh - time.monotonic()),
+        }
+
+
+google_oidc = OIDCMetadataCache(
+    settings.google_discovery_url,
+    min_refresh=settings.oidc_min_refresh_seconds,
+    max_refresh=settings.oidc_max_refresh_seconds,
+)
@@ -0,0 +1,311 @@
+# app/profiling.py
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Opt-in (PROFILING_ENABLED): sin el middleware registrado no hay Trace en el contexto y
+# span()/timed() se quedan en un ContextVar.get() por llamada.
+_current: ContextVar[Optional["Trace"]] = ContextVar("profiling_trace", default=None)
+# Profundidad del span abierto: por contexto, no por Trace. Las tareas hijas y los hilos de
+# run_blocking (copy_context) heredan la del padre y anidan bien aunque corran a la vez.
+_depth: ContextVar[int] = ContextVar("profiling_depth", default=0)
+
+# Rutas que no se perfilan (sondas y scrape)
+_SKIP_PATHS = frozenset({"/health", "/ready", "/metrics"})
+
+
+class Trace:
+    """Spans (nombre, inicio, fin, profundidad) de una request; tiempos en perf_counter."""
+
+    __slots__ = ("spans", "started")
+
+    def __init__(self) -> None:
+        self.spans: List[Tuple[str, float, float, int]] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        depth = _depth.get()
+        _depth.set(depth + 1)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            _depth.set(depth)
+            self.spans.append((name, t0, time.perf_counter(), depth))
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Fase con nombre dentro de la request perfilada (no-op si no hay profiler):
+      with span("callback.provision"):
+          ...
+    Las llamadas envueltas en metrics.timed() quedan como spans hijos automáticamente.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+# ── Muestreo de stacks ───────────────────────────────────────────────────────
+class StackSampler:
+    """
+    Hilo daemon que, mientras haya requests en curso, toma sys._current_frames() cada
+    `interval` segundos (event loop + pools de app/executor.py) y guarda stacks colapsados
+    en un buffer circular. Al cerrar una request capturada se toman las muestras de su
+    ventana de tiempo: con requests concurrentes el event loop es compartido, así que
+    son "lo que hacía el worker" durante esa request; los spans sí son por request.
+    """
+
+    def __init__(self, interval: float, max_samples: int = 50_000):
+        self.interval = interval
+        self.samples: Deque[Tuple[float, str]] = deque(maxlen=max_samples)
+        self.active = 0
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+
+    def ensure_started(self) -> None:
+        # por proceso: con preload_app el hilo del master no sobrevive al fork
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name="profiling-sampler", daemon=True).start()
+
+    def enter(self) -> None:
+        self.active += 1
+        self._wake.set()
+
+    def exit(self) -> None:
+        self.active -= 1
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while True:
+            if self.active <= 0:
+                self._wake.clear()
+                if self.active <= 0:
+                    self._wake.wait()
+            now = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.get(ident, str(ident))
+                self.samples.append((now, f"{name};{_collapse(frame)}"))
+            time.sleep(self.interval)
+
+    def window(self, start: float, end: float) -> Counter:
+        return Counter(stack for t, stack in list(self.samples) if start <= t <= end)
+
+
+def _collapse(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+sampler = StackSampler(interval=settings.profiling_interval_ms / 1000)
+
+
+# ── Salida: speedscope / collapsed + resumen por traza ───────────────────────
+def _speedscope(name: str, trace: Trace, duration: float, stacks: Counter) -> Dict[str, Any]:
+    frames: List[Dict[str, str]] = []
+    index: Dict[str, int] = {}
+
+    def frame_id(label: str) -> int:
+        if label not in index:
+            index[label] = len(frames)
+            frames.append({"name": label})
+        return index[label]
+
+    # spans -> perfil "evented" (abrir/cerrar bien anidados, en ms desde el inicio)
+    events: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, float]] = []
+    root = frame_id(name)
+    events.append({"type": "O", "frame": root, "at": 0.0})
+    for label, t0, t1, _ in sorted(trace.spans, key=lambda s: (s[1], -s[2])):
+        at, end = (t0 - trace.started) * 1000, (t1 - trace.started) * 1000
+        while stack and stack[-1][1] <= at:
+            fid, closed_at = stack.pop()
+            events.append({"type": "C", "frame": fid, "at": closed_at})
+        if stack:
+            end = min(end, stack[-1][1])  # solapes (p.ej. hilos) se recortan al padre
+        fid = frame_id(label)
+        events.append({"type": "O", "frame": fid, "at": at})
+        stack.append((fid, end))
+    while stack:
+        fid, closed_at = stack.pop()
+        events.append({"type": "C", "frame": fid, "at": closed_at})
+    total_ms = duration * 1000
+    events.append({"type": "C", "frame": root, "at": max(total_ms, events[-1]["at"])})
+
+    profiles: List[Dict[str, Any]] = [{
+        "type": "evented", "name": f"{name} (spans)", "unit": "milliseconds",
+        "startValue": 0.0, "endValue": events[-1]["at"], "events": events,
+    }]
+    if stacks:
+        samples = [[frame_id(f) for f in stack.split(";")] for stack in stacks]
+        profiles.append({
+            "type": "sampled", "name": f"{name} (stacks)", "unit": "none",
+            "startValue": 0, "endValue": sum(stacks.values()),
+            "samples": samples, "weights": list(stacks.values()),
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+        "name": name,
+        "exporter": "fastapi-oauth app/profiling.py",
+    }
+
+
+def _write_trace(summary: Dict[str, Any], trace: Trace, duration: float, stacks: Counter) -> None:
+    os.makedirs(settings.profiling_dir, exist_ok=True)
+    base = os.path.join(settings.profiling_dir, summary["id"])
+    name = f"{summary['method']} {summary['route']}"
+    if settings.profiling_format == "collapsed":
+        profile_path = f"{base}.collapsed.txt"
+        with open(profile_path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    else:
+        profile_path = f"{base}.speedscope.json"
+        with open(profile_path, "w") as f:
+            json.dump(_speedscope(name, trace, duration, stacks), f)
+    summary["profile"] = os.path.basename(profile_path)
+    with open(f"{base}.trace.json", "w") as f:
+        json.dump(summary, f)
+    _prune()
+
+
+def _prune() -> None:
+    # Solo las PROFILING_MAX_TRACES más recientes (compartido por todos los workers)
+    entries = sorted(
+        (e for e in os.scandir(settings.profiling_dir) if e.name.endswith(".trace.json")),
+        key=lambda e: e.stat().st_mtime,
+    )
+    for entry in entries[: max(0, len(entries) - settings.profiling_max_traces)]:
+        trace_id = entry.name[: -len(".trace.json")]
+        for suffix in (".trace.json", ".speedscope.json", ".collapsed.txt"):
+            try:
+                os.remove(os.path.join(settings.profiling_dir, trace_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_traces(limit: int = 50, slow_only: bool = True) -> List[Dict[str, Any]]:
+    """Resúmenes más recientes (de todos los workers: se leen del directorio)."""
+    if not os.path.isdir(settings.profiling_dir):
+        return []
+    entries = sorted(
+        (e for e in os.scandir(settings.profiling_dir) if e.name.endswith(".trace.json")),
+        key=lambda e: e.stat().st_mtime, reverse=True,
+    )
+    out = []
+    for entry in entries:
+        try:
+            with open(entry.path) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue  # podado o a medio escribir por otro worker
+        if slow_only and summary.get("reason") != "slow":
+            continue
+        out.append(summary)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def profile_path(trace_id: str) -> Optional[str]:
+    if not trace_id.replace("-", "").isalnum():
+        return None
+    for suffix in (".speedscope.json", ".collapsed.txt"):
+        path = os.path.join(settings.profiling_dir, trace_id + suffix)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# ── Middleware ASGI ──────────────────────────────────────────────────────────
+class ProfilingMiddleware:
+    """
+    Abre un Trace por request; al terminar la guarda si superó PROFILING_SLOW_MS
+    (siempre) o si cae en la fracción PROFILING_SAMPLE_RATE. Escritura a disco en un hilo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _SKIP_PATHS:
+            return await self.app(scope, receive, send)
+        sampler.ensure_started()
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        trace = Trace()
+        token = _current.set(trace)
+        sampler.enter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            sampler.exit()
+            _current.reset(token)
+            ended = time.perf_counter()
+            duration = ended - trace.started
+            slow = duration * 1000 >= settings.profiling_slow_ms
+            if slow or random.random() < settings.profiling_sample_rate:
+                route = scope.get("route")
+                summary = {
+                    "id": f"{int(time.time() * 1000)}-{secrets.token_hex(4)}",
+                    "reason": "slow" if slow else "sampled",
+                    "method": scope["method"],
+                    "route": getattr(route, "path", "unmatched"),
+                    "path": scope["path"],
+                    "status": status["code"],
+                    "duration_ms": round(duration * 1000, 2),
+                    "started_at": time.time() - duration,
+                    "pid": os.getpid(),
+                    "spans": [
+                        {"name": n, "start_ms": round((t0 - trace.started) * 1000, 3),
+                         "duration_ms": round((t1 - t0) * 1000, 3), "depth": d}
+                        for n, t0, t1, d in sorted(trace.spans, key=lambda s: s[1])
+                    ],
+                }
+                stacks = sampler.window(trace.started, ended)
+                try:
+                    await run_blocking("profiling", _write_trace, summary, trace, duration, stacks)
+                except OSError as e:
+                    logger.warning("profiling: could not write trace %s: %s", summary["id"], e)
@@ -0,0 +1,172 @@
+# app/refresh_tokens.py
+import hashlib
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Protocol
+
+from app.config import settings
+from app.firebase import get_firestore
+from app.metrics import timed
+
+
+class RefreshTokenError(Exception):
+    pass
+
+
+@dataclass
+class RefreshRecord:
+    token_hash: str
+    family_id: str
+    uid: str
+    expires_at: int
+    used: bool = False
+    revoked: bool = False
+
+
+class RefreshTokenStore(Protocol):
+    def put(self, rec: RefreshRecord) -> None: ...
+    def get(self, token_hash: str) -> Optional[RefreshRecord]: ...
+    def mark_used(self, token_hash: str) -> bool:
+        """Marca el token como usado de forma atómica; False si ya lo estaba (reuso)."""
+        ...
+    def revoke_family(self, family_id: str) -> None: ...
+
+
+class InMemoryRefreshStore:
+    def __init__(self) -> None:
+        self._data: Dict[str, RefreshRecord] = {}
+        self._lock = threading.Lock()
+
+    def put(self, rec: RefreshRecord) -> None:
+        with self._lock:
+            self._data[rec.token_hash] = rec
+
+    def get(self, token_hash: str) -> Optional[RefreshRecord]:
+        rec = self._data.get(token_hash)
+        return RefreshRecord(**asdict(rec)) if rec else None
+
+    def mark_used(self, token_hash: str) -> bool:
+        with self._lock:
+            rec = self._data.get(token_hash)
+            if rec is None or rec.used:
+                return False
+            rec.used = True
+            return True
+
+    def revoke_family(self, family_id: str) -> None:
+        with self._lock:
+            for rec in self._data.values():
+                if rec.family_id == family_id:
+                    rec.revoked = True
+
+
+_RECORD_FIELDS = tuple(f.name for f in fields(RefreshRecord))
+
+
+def _expire_at(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+def _from_doc(data: Dict[str, Any]) -> RefreshRecord:
+    return RefreshRecord(**{k: data[k] for k in _RECORD_FIELDS if k in data})
+
+
+class FirestoreRefreshStore:
+    """
+    Un doc por token, id = sha256(token): el lookup es un get por id.
+    'expire_at' (Timestamp) es para una política TTL de Firestore sobre la colección:
+    la vida del token y, una vez rotado, solo la ventana de detección de reuso
+    (REFRESH_REUSE_DETECTION_DAYS). Así una familia no acumula docs sin límite.
+    """
+
+    def _col(self):
+        return get_firestore().collection(settings.firestore_refresh_collection)
+
+    def put(self, rec: RefreshRecord) -> None:
+        self._col().document(rec.token_hash).set({**asdict(rec), "expire_at": _expire_at(rec.expires_at)})
+
+    def get(self, token_hash: str) -> Optional[RefreshRecord]:
+        snap = self._col().document(token_hash).get()
+        return _from_doc(snap.to_dict() or {}) if snap.exists else None
+
+    def mark_used(self, token_hash: str) -> bool:
+        from app.repos.firestore_users import run_transaction
+
+        ref = self._col().document(token_hash)
+
+        def _mark(transaction) -> bool:
+            snap = ref.get(transaction=transaction)
+            data = snap.to_dict() or {}
+            if not snap.exists or data.get("used"):
+                return False
+            # rotado: solo sirve para detectar reuso; expira antes que la familia
+            window_end = time.time() + settings.refresh_reuse_detection_days * 86400
+            transaction.update(ref, {
+                "used": True,
+                "expire_at": _expire_at(min(data.get("expires_at", window_end), window_end)),
+            })
+            return True
+
+        return run_transaction(_mark)
+
+    def revoke_family(self, family_id: str) -> None:
+        fs = get_firestore()
+        refs = [snap.reference for snap in self._col().where("family_id", "==", family_id).stream()]
+        for i in range(0, len(refs), 500):  # límite de WriteBatch
+            batch = fs.batch()
+            for ref in refs[i:i + 500]:
+                batch.update(ref, {"revoked": True})
+            batch.commit()
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _make_store() -> RefreshTokenStore:
+    if settings.refresh_token_store == "memory":
+        return InMemoryRefreshStore()
+    return FirestoreRefreshStore()
+
+
+refresh_store: RefreshTokenStore = _make_store()
+
+
+def issue_refresh_token(uid: str, family_id: Optional[str] = None) -> str:
+    token = secrets.token_urlsafe(32)
+    refresh_store.put(RefreshRecord(
+        token_hash=_hash(token),
+        family_id=family_id or secrets.token_hex(8),
+        uid=uid,
+        expires_at=int(time.time()) + settings.refresh_token_ttl_days * 86400,
+    ))
+    return token
+
+
+def rotate_refresh_token(token: str) -> tuple[str, str]:
+    """
+    Consume un refresh token y emite el siguiente de la misma familia.
+    Devuelve (uid, nuevo_token). Si el token ya fue usado (reuso => posible robo)
+    se revoca toda la familia.
+    """
+    h = _hash(token)
+    with timed("refresh_store", "get"):
+        rec = refresh_store.get(h)
+    if rec is None or rec.revoked or rec.expires_at < time.time():
+        raise RefreshTokenError("Refresh token inválido o expirado")
+    with timed("refresh_store", "mark_used"):
+        first_use = not rec.used and refresh_store.mark_used(h)
+    if not first_use:
+        refresh_store.revoke_family(rec.family_id)
+        raise RefreshTokenError("Refresh token reutilizado; sesión revocada")
+    return rec.uid, issue_refresh_token(rec.uid, family_id=rec.family_id)
+
+
+def revoke_refresh_token(token: str) -> None:
+    """Logout: revoca la familia completa del refresh token (si existe)."""
+    rec = refresh_store.get(_hash(token))
+    if rec is not None:
+        refresh_store.revoke_family(rec.family_id)
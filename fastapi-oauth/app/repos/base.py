@@ -0,0 +1,51 @@
+# app/repos/base.py
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+
+class Watch(Protocol):
+    def unsubscribe(self) -> None: ...
+
+
+class UsersBackend(Protocol):
+    """
+    Contrato de almacenamiento detrás de app/repos/users_repo.py.
+    Implementaciones (módulos): app/repos/firestore_users.py y app/repos/sql_users.py.
+    Los documentos de usuario siempre se exponen como el dict de schemas.UserDoc.
+    """
+
+    def get_doc(self, uid: str) -> Optional[Dict[str, Any]]: ...
+
+    def upsert_from_google(self, uid: str, data: Dict[str, Any], now: int) -> Tuple[Dict[str, Any], bool]:
+        """
+        Crea o actualiza el perfil (sin pisar roles). Devuelve (doc final, escrito).
+        Si 'profile_fp' no cambió puede no escribir nada: last_login va por touch_logins.
+        """
+        ...
+
+    def touch_logins(self, last_login_by_uid: Dict[str, int]) -> None:
+        """Escritura en lote de last_login (write-behind)."""
+        ...
+
+    def update_roles(self, uid: str, roles: List[str], roles_version: int, now: int) -> None: ...
+
+    def set_active(self, uid: str, active: bool, now: int) -> bool:
+        """Activa/desactiva la cuenta. False si el usuario no existe."""
+        ...
+
+    def update_roles_bulk(self, items: List[Dict[str, Any]], roles_version: int, now: int) -> List[Dict[str, Any]]: ...
+
+    def list_users(self, fields: List[str], role: Optional[str] = None, active: Optional[bool] = None,
+                   start_after: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Página de usuarios ordenada por uid, proyectada a `fields` (incluye siempre 'uid').
+        Devuelve (items, cursor siguiente | None). Paginación por cursor, nunca por offset.
+        """
+        ...
+
+    def watch(self, on_change: Callable[[str, Optional[Dict[str, Any]]], None]) -> Optional[Watch]:
+        """Suscripción a cambios remotos (None si el backend no la soporta)."""
+        ...
+
+    def load_bootstrap_flag(self) -> bool: ...
+
+    def migrate_bootstrap_flag(self) -> Dict[str, Any]: ...
@@ -0,0 +1,241 @@
+# app/repos/firestore_users.py
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.config import settings
+from app.firebase import get_firestore
+
+logger = logging.getLogger(__name__)
+
+# Una vez que existe un HR_ADMIN inicial el flag no vuelve atrás: se cachea en proceso
+# y los signups siguientes no leen el doc de metadatos.
+_admin_bootstrapped = False
+
+T = TypeVar("T")
+
+def _users_col():
+    fs = get_firestore()
+    return fs.collection(settings.firestore_users_collection)
+
+def _bootstrap_ref():
+    fs = get_firestore()
+    return fs.collection(settings.firestore_meta_collection).document("bootstrap")
+
+def run_transaction(fn: Callable[[Any], T]) -> T:
+    """Ejecuta fn(transaction) en una transacción Firestore (con reintentos del SDK)."""
+    fs = get_firestore()
+    runner = getattr(fs, "run_transaction", None)  # fakes en memoria (bench/fakes.py)
+    if runner is not None:
+        return runner(fn)
+    from firebase_admin import firestore
+    return firestore.transactional(fn)(fs.transaction())
+
+def _is_first_user(transaction=None) -> bool:
+    # Si no hay documentos aún, es el primero (solo para despliegues sin doc 'bootstrap')
+    snaps = _users_col().limit(1).get(transaction=transaction)
+    return next(iter(snaps), None) is None
+
+def _needs_admin_bootstrap(transaction) -> bool:
+    """
+    True si el usuario que se está creando debe ser el HR_ADMIN inicial.
+    Lectura puntual de system/bootstrap dentro de la transacción: dos primeros
+    logins concurrentes chocan en ese doc y solo uno gana.
+    """
+    global _admin_bootstrapped
+    if _admin_bootstrapped:
+        return False
+    meta = _bootstrap_ref().get(transaction=transaction)
+    if meta.exists:
+        bootstrapped = bool((meta.to_dict() or {}).get("admin_bootstrapped"))
+    else:
+        bootstrapped = not _is_first_user(transaction)
+        if bootstrapped:
+            # despliegue previo sin metadatos: se auto-migra en esta misma transacción
+            transaction.set(_bootstrap_ref(), {"admin_bootstrapped": True, "bootstrapped_at": int(time.time())})
+    if bootstrapped and meta.exists:
+        _admin_bootstrapped = True
+    return not bootstrapped
+
+def load_bootstrap_flag() -> bool:
+    """Precarga el flag en proceso (lifespan) con una lectura del doc de metadatos."""
+    global _admin_bootstrapped
+    if not _admin_bootstrapped:
+        snap = _bootstrap_ref().get()
+        _admin_bootstrapped = bool(snap.exists and (snap.to_dict() or {}).get("admin_bootstrapped"))
+    return _admin_bootstrapped
+
+def migrate_bootstrap_flag() -> Dict[str, Any]:
+    """
+    Migración para despliegues existentes: si ya hay usuarios, marca
+    system/bootstrap.admin_bootstrapped=True. Idempotente.
+    """
+    ref = _bootstrap_ref()
+    snap = ref.get()
+    if snap.exists and (snap.to_dict() or {}).get("admin_bootstrapped"):
+        return {"changed": False, "admin_bootstrapped": True}
+    if _is_first_user():
+        return {"changed": False, "admin_bootstrapped": False}
+    ref.set({"admin_bootstrapped": True, "bootstrapped_at": int(time.time())}, merge=True)
+    return {"changed": True, "admin_bootstrapped": True}
+
+# Margen del filtro del watch: tolera relojes de otras réplicas algo retrasados
+_WATCH_SKEW_S = 5
+
+def watch(on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+    """
+    on_snapshot de los usuarios modificados desde el arranque; on_change(uid, doc|None)
+    por cada cambio. Sobre la colección entera el snapshot inicial leería todos los docs
+    en cada worker de cada réplica; así solo se leen (y se retienen) los que cambian.
+    Todas las escrituras de perfil/roles/active actualizan 'updated_at'.
+    """
+    def _on_snapshot(col_snapshot, changes, read_time) -> None:
+        for change in changes:
+            removed = change.type.name == "REMOVED"
+            on_change(change.document.id, None if removed else (change.document.to_dict() or {}))
+    since = int(time.time()) - _WATCH_SKEW_S
+    return _users_col().where("updated_at", ">", since).on_snapshot(_on_snapshot)
+
+def get_doc(uid: str) -> Optional[Dict[str, Any]]:
+    snap = _users_col().document(uid).get()
+    return snap.to_dict() if snap.exists else None
+
+def upsert_from_google(uid: str, data: Dict[str, Any], now: int) -> Tuple[Dict[str, Any], bool]:
+    """
+    Upsert transaccional: una lectura y, solo si el perfil cambió (profile_fp), una escritura.
+    """
+    doc_ref = _users_col().document(uid)
+
+    def _upsert(transaction) -> Tuple[Dict[str, Any], bool]:
+        snap = doc_ref.get(transaction=transaction)
+        if not snap.exists:
+            # ⛳ primer usuario del sistema => HR_ADMIN
+            roles = ["EMPLOYEE"]
+            if _needs_admin_bootstrap(transaction):
+                roles = ["HR_ADMIN"]  # que admin arranque
+                transaction.set(_bootstrap_ref(), {
+                    "admin_bootstrapped": True,
+                    "bootstrapped_uid": uid,
+                    "bootstrapped_at": now,
+                })
+            new_doc = {**data, "active": True, "roles": roles, "created_at": now}
+            transaction.set(doc_ref, new_doc)
+            return new_doc, True
+        existing = snap.to_dict() or {}
+        if existing.get("profile_fp") == data.get("profile_fp"):
+            # sin cambios de perfil: nada que escribir aquí (last_login va por write-behind)
+            return {**existing, "last_login": now}, False
+        # no pisar roles ni 'active' existentes (merge sin esos campos)
+        transaction.set(doc_ref, data, merge=True)
+        return {**existing, **data, "roles": existing.get("roles", ["EMPLOYEE"])}, True
+
+    global _admin_bootstrapped
+    final, written = run_transaction(_upsert)
+    if "HR_ADMIN" in final.get("roles", []):
+        _admin_bootstrapped = True
+    return final, written
+
+def _is_not_found(e: Exception) -> bool:
+    try:
+        from google.api_core.exceptions import NotFound
+    except ImportError:
+        return False
+    return isinstance(e, NotFound)
+
+def _commit_touches(fs, col, chunk: List[Tuple[str, int]]) -> None:
+    batch = fs.batch()
+    for uid, ts in chunk:
+        batch.update(col.document(uid), {"last_login": ts})
+    batch.commit()
+
+def touch_logins(last_login_by_uid: Dict[str, int]) -> None:
+    """
+    update (no set+merge): un uid borrado no debe resucitar como doc con solo last_login.
+    Un doc inexistente tumba el lote entero; se descartan esos uids y se reintenta el resto
+    (si no, el lote volvería a la cola en cada flush para siempre).
+    """
+    fs = get_firestore()
+    col = _users_col()
+    items = list(last_login_by_uid.items())
+    for i in range(0, len(items), 500):  # límite de WriteBatch
+        chunk = items[i:i + 500]
+        try:
+            _commit_touches(fs, col, chunk)
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            existing = {snap.id for snap in fs.get_all([col.document(uid) for uid, _ in chunk]) if snap.exists}
+            kept = [(uid, ts) for uid, ts in chunk if uid in existing]
+            logger.info("touch_logins: dropping %d deleted uid(s)", len(chunk) - len(kept))
+            if kept:
+                _commit_touches(fs, col, kept)
+
+def list_users(fields: List[str], role: Optional[str] = None, active: Optional[bool] = None,
+               start_after: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Cursor sobre el campo 'uid' (start_after, sin offsets) con select() para transferir
+    solo los campos pedidos. Filtros role/active usan los índices compuestos de
+    firestore.indexes.json. Se pide limit+1 para saber si hay página siguiente.
+    """
+    q = _users_col()
+    if role:
+        q = q.where("roles", "array_contains", role)
+    if active is not None:
+        q = q.where("active", "==", active)
+    q = q.order_by("uid").select(fields)
+    if start_after:
+        q = q.start_after({"uid": start_after})
+    items = [snap.to_dict() or {} for snap in q.limit(limit + 1).stream()]
+    if len(items) > limit:
+        items = items[:limit]
+        return items, items[-1]["uid"]
+    return items, None
+
+def update_roles(uid: str, roles: List[str], roles_version: int, now: int) -> None:
+    _users_col().document(uid).set({
+        "roles": roles,
+        "roles_version": roles_version,
+        "updated_at": now,
+    }, merge=True)
+
+def set_active(uid: str, active: bool, now: int) -> bool:
+    ref = _users_col().document(uid)
+    if not ref.get().exists:
+        return False
+    ref.update({"active": active, "updated_at": now})
+    return True
+
+def update_roles_bulk(items: List[Dict[str, Any]], roles_version: int, now: int) -> List[Dict[str, Any]]:
+    """
+    Aplica roles a un lote (<= 500) de {"uid" | "email", "roles"} con una sola
+    WriteBatch. Emails se resuelven con queries 'in' (30 por query) y la existencia
+    de los docs con un único get_all. Devuelve un resultado por item, en orden.
+    """
+    fs = get_firestore()
+    col = _users_col()
+
+    emails = sorted({it["email"] for it in items if not it.get("uid") and it.get("email")})
+    uid_by_email: Dict[str, str] = {}
+    for i in range(0, len(emails), 30):
+        for snap in col.where("email", "in", emails[i:i + 30]).stream():
+            uid_by_email.setdefault(snap.get("email"), snap.id)
+
+    uids = [it.get("uid") or uid_by_email.get(it.get("email") or "") for it in items]
+    wanted = sorted({u for u in uids if u})
+    existing = {snap.id for snap in fs.get_all([col.document(u) for u in wanted]) if snap.exists} if wanted else set()
+
+    batch = fs.batch()
+    results: List[Dict[str, Any]] = []
+    for it, uid in zip(items, uids):
+        if not uid or uid not in existing:
+            results.append({"uid": uid, "email": it.get("email"), "ok": False, "error": "Usuario no encontrado"})
+            continue
+        batch.update(col.document(uid), {
+            "roles": it["roles"],
+            "roles_version": roles_version,
+            "updated_at": now,
+        })
+        results.append({"uid": uid, "ok": True, "roles": it["roles"]})
+    if existing:
+        batch.commit()
+    return results
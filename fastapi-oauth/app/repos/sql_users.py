@@ -0,0 +1,185 @@
+# app/repos/sql_users.py
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, inspect as sa_inspect, select, update
+from sqlalchemy.orm import joinedload
+
+from app.database import SessionLocal, get_engine
+from app.models import OAuthAccount, Staff, StaffRole
+from app.services.auth_service import (
+    PROVIDER,
+    _needs_admin_bootstrap,
+    get_or_create_staff_from_google,
+    load_oauth_account,
+)
+
+_admin_bootstrapped = False
+
+def _session():
+    get_engine()
+    return SessionLocal()
+
+def _epoch(dt: Optional[datetime]) -> Optional[int]:
+    if dt is None:
+        return None
+    return int(dt.replace(tzinfo=timezone.utc).timestamp()) if dt.tzinfo is None else int(dt.timestamp())
+
+def _loaded(obj: Any, attr: str) -> Any:
+    # Columnas con default/onupdate del servidor quedan expiradas tras el commit;
+    # no las recargamos (sería una query extra por login).
+    return None if attr in sa_inspect(obj).unloaded else getattr(obj, attr)
+
+def _to_doc(link: OAuthAccount, now: Optional[int] = None) -> Dict[str, Any]:
+    staff = link.staff
+    doc = {
+        "uid": link.provider_sub,
+        "email": staff.email,
+        "name": f"{staff.first_name} {staff.last_name}".strip(),
+        "given_name": staff.first_name,
+        "family_name": staff.last_name,
+        "username": staff.username,
+        "active": bool(staff.active),
+        "picture": None,
+        "provider": link.provider,
+        "provider_sub": link.provider_sub,
+        "roles": sorted(r.role for r in staff.roles),
+        "roles_version": link.roles_version or 0,
+        "created_at": _epoch(_loaded(link, "created_at")),
+        "updated_at": _epoch(_loaded(staff, "last_update")),
+        "last_login": _epoch(link.last_login),
+    }
+    if now is not None:
+        doc["updated_at"] = doc["last_login"] = now
+        doc["created_at"] = doc["created_at"] or now
+    return doc
+
+def _set_staff_roles(staff: Staff, roles: List[str]) -> None:
+    # diff en lugar de reemplazar la colección: evita borrar/insertar la misma PK
+    wanted = set(roles)
+    for r in list(staff.roles):
+        if r.role not in wanted:
+            staff.roles.remove(r)
+    have = {r.role for r in staff.roles}
+    for role in roles:
+        if role not in have:
+            staff.roles.append(StaffRole(role=role))
+
+def get_doc(uid: str) -> Optional[Dict[str, Any]]:
+    with _session() as db:
+        link = load_oauth_account(db, uid)
+        return _to_doc(link) if link else None
+
+def upsert_from_google(uid: str, data: Dict[str, Any], now: int) -> Tuple[Dict[str, Any], bool]:
+    # El ORM solo emite UPDATE de las columnas que cambian; last_login se escribe en la misma transacción
+    global _admin_bootstrapped
+    profile = {
+        "sub": uid,
+        "email": data["email"],
+        "given_name": data.get("given_name") or "",
+        "family_name": data.get("family_name") or "",
+        "picture": data.get("picture"),
+    }
+    with _session() as db:
+        link = get_or_create_staff_from_google(db, profile)
+        doc = _to_doc(link, now=now)
+    if "HR_ADMIN" in doc["roles"]:
+        _admin_bootstrapped = True
+    return doc, True
+
+def touch_logins(last_login_by_uid: Dict[str, int]) -> None:
+    stmt = (
+        update(OAuthAccount)
+        .where(OAuthAccount.provider == PROVIDER, OAuthAccount.provider_sub == bindparam("uid"))
+        .values(last_login=bindparam("ts"))
+    )
+    rows = [{"uid": uid, "ts": datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)}
+            for uid, ts in last_login_by_uid.items()]
+    with _session() as db:
+        db.connection().execute(stmt, rows)
+        db.commit()
+
+def update_roles(uid: str, roles: List[str], roles_version: int, now: int) -> None:
+    with _session() as db:
+        link = load_oauth_account(db, uid)
+        if link is None:
+            return
+        _set_staff_roles(link.staff, roles)
+        link.roles_version = roles_version
+        db.commit()
+
+def set_active(uid: str, active: bool, now: int) -> bool:
+    with _session() as db:
+        link = load_oauth_account(db, uid)
+        if link is None:
+            return False
+        link.staff.active = active
+        db.commit()
+    return True
+
+def update_roles_bulk(items: List[Dict[str, Any]], roles_version: int, now: int) -> List[Dict[str, Any]]:
+    """Resuelve uids y emails con dos queries IN y aplica todo en una sola transacción."""
+    uids = sorted({it["uid"] for it in items if it.get("uid")})
+    emails = sorted({it["email"] for it in items if not it.get("uid") and it.get("email")})
+    opts = joinedload(OAuthAccount.staff).joinedload(Staff.roles)
+    with _session() as db:
+        by_uid: Dict[str, OAuthAccount] = {}
+        by_email: Dict[str, OAuthAccount] = {}
+        if uids:
+            stmt = select(OAuthAccount).options(opts).where(
+                OAuthAccount.provider == PROVIDER, OAuthAccount.provider_sub.in_(uids))
+            by_uid = {l.provider_sub: l for l in db.execute(stmt).unique().scalars()}
+        if emails:
+            stmt = select(OAuthAccount).join(OAuthAccount.staff).options(opts).where(
+                OAuthAccount.provider == PROVIDER, Staff.email.in_(emails))
+            for l in db.execute(stmt).unique().scalars():
+                by_email.setdefault(l.staff.email, l)
+
+        results: List[Dict[str, Any]] = []
+        for it in items:
+            link = by_uid.get(it.get("uid") or "") if it.get("uid") else by_email.get(it.get("email") or "")
+            if link is None:
+                results.append({"uid": it.get("uid"), "email": it.get("email"), "ok": False,
+                                "error": "Usuario no encontrado"})
+                continue
+            _set_staff_roles(link.staff, it["roles"])
+            link.roles_version = roles_version
+            results.append({"uid": link.provider_sub, "ok": True, "roles": it["roles"]})
+        db.commit()
+    return results
+
+def list_users(fields: List[str], role: Optional[str] = None, active: Optional[bool] = None,
+               start_after: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset sobre (provider, provider_sub) — el índice único — en lugar de OFFSET."""
+    stmt = (
+        select(OAuthAccount).join(OAuthAccount.staff)
+        .options(joinedload(OAuthAccount.staff).joinedload(Staff.roles))
+        .where(OAuthAccount.provider == PROVIDER)
+        .order_by(OAuthAccount.provider_sub)
+        .limit(limit + 1)
+    )
+    if start_after:
+        stmt = stmt.where(OAuthAccount.provider_sub > start_after)
+    if active is not None:
+        stmt = stmt.where(Staff.active == active)
+    if role:
+        stmt = stmt.where(Staff.roles.any(StaffRole.role == role))
+    with _session() as db:
+        links = list(db.execute(stmt).unique().scalars())
+        items = [{k: v for k, v in _to_doc(l).items() if k in fields} for l in links[:limit]]
+    return items, (items[-1]["uid"] if len(links) > limit else None)
+
+def watch(on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+    # Sin notificaciones de cambios: la cache depende del TTL y del write-through local
+    return None
+
+def load_bootstrap_flag() -> bool:
+    global _admin_bootstrapped
+    if not _admin_bootstrapped:
+        with _session() as db:
+            _admin_bootstrapped = not _needs_admin_bootstrap(db)
+    return _admin_bootstrapped
+
+def migrate_bootstrap_flag() -> Dict[str, Any]:
+    # En SQL el flag se deriva de staff_role: no hay nada que sembrar
+    return {"changed": False, "admin_bootstrapped": load_bootstrap_flag()}
@@ -1,20 +1,89 @@
 # app/repos/users_repo.py
+import hashlib
+import json
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone
 
-from app.firebase import get_firestore
+from app.shared_cache import make_cache
 from app.config import settings
+from app.metrics import register_cache, timed
+from app.repos.base import UsersBackend
+from app.repos.write_behind import LoginTouchQueue
+from app.revocation import revoke_user_tokens
 from app.schemas import UserOut
 
-def _users_col():
-    fs = get_firestore()
-    return fs.collection(settings.firestore_users_collection)
+# Cache read-through de documentos de usuario (uid -> dict).
+# Se invalida por write-through en escrituras locales y por el watch del backend
+# (on_snapshot en Firestore) para cambios hechos por otras réplicas.
+# Con SHARED_CACHE=true vive en memoria compartida: un doc leído por un worker es hit en todos.
+user_doc_cache = make_cache(
+    "user_doc",
+    max_size=settings.user_cache_max_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+register_cache("user_doc", user_doc_cache.stats)
+_users_watch = None
+# last_login de logins sin cambios de perfil: se escribe en lote (flush periódico + al apagar)
+login_touches = LoginTouchQueue()
+_backend_impl: Optional[UsersBackend] = None
+
+def _backend() -> UsersBackend:
+    """Backend elegido por USERS_BACKEND (firestore | sql); se importa solo el que se usa."""
+    global _backend_impl
+    if _backend_impl is None:
+        if settings.users_backend == "sql":
+            from app.repos import sql_users as impl
+        else:
+            from app.repos import firestore_users as impl
+        _backend_impl = impl
+    return _backend_impl
+
+def _cache_put(uid: str, data: Optional[Dict[str, Any]]) -> None:
+    if not settings.user_cache_enabled:
+        return
+    if data is None:
+        user_doc_cache.invalidate(uid)
+    else:
+        user_doc_cache.set(uid, dict(data))
+
+def _on_remote_change(uid: str, fresh: Optional[Dict[str, Any]]) -> None:
+    # Corre en un hilo del SDK; la cache (local o compartida) es thread-safe.
+    # Solo refrescamos entradas ya cacheadas (el snapshot inicial trae los cambiados desde el arranque).
+    if fresh is None:
+        user_doc_cache.invalidate(uid)
+        return
+    cached = user_doc_cache.peek(uid)
+    if cached is None:
+        return
+    if (fresh.get("updated_at") or 0) >= (cached.get("updated_at") or 0):
+        user_doc_cache.set(uid, fresh)
+    else:
+        user_doc_cache.invalidate(uid)
+
+def start_users_listener() -> None:
+    """Suscribe el watch del backend para invalidar la cache ante cambios remotos."""
+    global _users_watch
+    if _users_watch is not None or not (settings.user_cache_enabled and settings.user_cache_listen):
+        return
+    _users_watch = _backend().watch(_on_remote_change)
+
+def stop_users_listener() -> None:
+    global _users_watch
+    if _users_watch is not None:
+        _users_watch.unsubscribe()
+        _users_watch = None
+
+def load_bootstrap_flag() -> bool:
+    return _backend().load_bootstrap_flag()
+
+def migrate_bootstrap_flag() -> Dict[str, Any]:
+    return _backend().migrate_bootstrap_flag()
 
 def _epoch_to_dt(ts: Optional[int]) -> Optional[datetime]:
     return datetime.fromtimestamp(ts, tz=timezone.utc) if ts else None
 
-def _to_user_out(data: Dict[str, Any]) -> UserOut:
+def to_user_out(data: Dict[str, Any]) -> UserOut:
     return UserOut(
         uid=data["uid"],
         first_name=data.get("given_name"),
@@ -25,22 +94,66 @@ def _to_user_out(data: Dict[str, Any]) -> UserOut:
         last_update=_epoch_to_dt(data.get("updated_at")),
     )
 
-def _is_first_user() -> bool:
-    # Si no hay documentos aún, es el primero
-    it = _users_col().limit(1).stream()
-    return next(it, None) is None
-
 def get_user_by_uid(uid: str) -> Optional[UserOut]:
-    doc = _users_col().document(uid).get()
-    if not doc.exists:
+    doc = get_user_doc(uid)
+    if not doc:
+        return None
+    return to_user_out(doc)
+
+def peek_user_doc(uid: str) -> Optional[Dict[str, Any]]:
+    """Solo cache local (nunca el backend); None si no está cacheado."""
+    if not settings.user_cache_enabled:
         return None
-    return _to_user_out(doc.to_dict())
+    return user_doc_cache.peek(uid)
 
 def get_user_doc(uid: str) -> Optional[Dict[str, Any]]:
-    snap = _users_col().document(uid).get()
-    return snap.to_dict() if snap.exists else None
+    if settings.user_cache_enabled:
+        cached = user_doc_cache.get(uid)
+        if cached is not None:
+            return dict(cached)
+    with timed(settings.users_backend, "get_doc"):
+        data = _backend().get_doc(uid)
+    if data is not None:
+        _cache_put(uid, data)
+    return data
+
+# Campos que se pueden pedir en el listado (?fields=); 'uid' va siempre (es el cursor)
+USER_LIST_FIELDS = ("uid", "email", "given_name", "family_name", "username", "active",
+                    "roles", "updated_at", "last_login")
+
+def list_users(fields: List[str], role: Optional[str] = None, active: Optional[bool] = None,
+               cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página de usuarios proyectada (no pasa por la cache: son docs parciales)."""
+    fields = ["uid"] + [f for f in fields if f != "uid"]
+    with timed(settings.users_backend, "list_users"):
+        return _backend().list_users(fields, role=role, active=active, start_after=cursor, limit=limit)
+
+_PROFILE_FIELDS = ("email", "name", "given_name", "family_name", "username", "picture", "provider", "provider_sub")
+
+def _profile_fingerprint(data: Dict[str, Any]) -> str:
+    raw = json.dumps([data.get(k) for k in _PROFILE_FIELDS], separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def flush_login_touches() -> int:
+    """Escribe en lote los last_login pendientes. Devuelve cuántos se escribieron."""
+    pending = login_touches.drain()
+    if not pending:
+        return 0
+    try:
+        with timed(settings.users_backend, "touch_logins"):
+            _backend().touch_logins(pending)
+    except Exception:
+        login_touches.requeue(pending)
+        raise
+    return len(pending)
 
-def create_or_update_from_google(profile: Dict[str, Any], uid: str) -> UserOut:
+def create_or_update_from_google(profile: Dict[str, Any], uid: str) -> Dict[str, Any]:
+    """
+    Upsert del perfil de Google (una transacción en el backend).
+    Devuelve el documento final (roles incluidos), así el router no necesita releerlo.
+    Si la huella del perfil no cambió no hay escritura síncrona: solo se encola last_login.
+    Nunca toca 'active': una cuenta dada de baja sigue de baja (el router rechaza el login).
+    """
     now = int(time.time())
     email = profile["email"]
     base_username = (profile.get("given_name") or email.split("@")[0]).strip().lower()[:16] or "user"
@@ -52,32 +165,60 @@ def create_or_update_from_google(profile: Dict[str, Any], uid: str) -> UserOut:
         "given_name": profile.get("given_name"),
         "family_name": profile.get("family_name"),
         "username": base_username,
-        "active": True,
         "picture": profile.get("picture"),
         "provider": "google",
         "provider_sub": profile.get("sub"),
         "updated_at": now,
         "last_login": now,
     }
+    data["profile_fp"] = _profile_fingerprint(data)
 
-    doc_ref = _users_col().document(uid)
-    snap = doc_ref.get()
-    if not snap.exists:
-        # ⛳ primer usuario del sistema => HR_ADMIN
-        roles = ["EMPLOYEE"]
-        if _is_first_user():
-            roles = ["HR_ADMIN"]  # que admin arranque
-        data["roles"] = roles
-        data["created_at"] = now
-        doc_ref.set(data)
-    else:
-        # no pisar roles existentes
-        existing = snap.to_dict() or {}
-        data["roles"] = existing.get("roles", ["EMPLOYEE"])
-        doc_ref.set(data, merge=True)
-
-    return _to_user_out({**snap.to_dict(), **data} if snap.exists else data)
+    cached = peek_user_doc(uid)
+    if cached and cached.get("profile_fp") == data["profile_fp"]:
+        # login recurrente sin cambios y doc en cache: cero round trips síncronos.
+        # Sin re-put: la entrada conserva su expiración y los roles cambiados en otra
+        # réplica (o sin listener) se releen al vencer el TTL aunque el usuario siga entrando.
+        final = {**cached, "last_login": now}
+        login_touches.add(uid, now)
+        return final
+    with timed(settings.users_backend, "upsert_from_google"):
+        final, written = _backend().upsert_from_google(uid, data, now)
+    if not written:
+        login_touches.add(uid, now)
+    _cache_put(uid, final)
+    return final
 
 def set_roles(uid: str, roles: list[str]) -> Dict[str, Any]:
-    _users_col().document(uid).set({"roles": roles, "updated_at": int(time.time())}, merge=True)
+    now = time.time()
+    with timed(settings.users_backend, "update_roles"):
+        _backend().update_roles(uid, roles, int(now * 1000), int(now))
+    # write-through: la siguiente lectura vuelve al backend con el doc ya actualizado
+    _cache_put(uid, None)
+    # los access tokens con los roles anteriores dejan de valer en todos los workers
+    revoke_user_tokens([uid])
     return get_user_doc(uid) or {}
+
+def set_active(uid: str, active: bool) -> Optional[Dict[str, Any]]:
+    """Activa/desactiva una cuenta; al desactivar se revocan sus access tokens vigentes."""
+    with timed(settings.users_backend, "set_active"):
+        found = _backend().set_active(uid, active, int(time.time()))
+    if not found:
+        return None
+    _cache_put(uid, None)
+    if not active:
+        revoke_user_tokens([uid])
+    return get_user_doc(uid)
+
+def set_roles_bulk(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aplica roles a un lote de {"uid" | "email", "roles"} en una sola escritura
+    del backend. Devuelve un resultado por item, en orden.
+    """
+    now = time.time()
+    with timed(settings.users_backend, "update_roles_bulk"):
+        results = _backend().update_roles_bulk(items, int(now * 1000), int(now))
+    changed = [r["uid"] for r in results if r.get("ok")]
+    for uid in changed:
+        _cache_put(uid, None)
+    revoke_user_tokens(changed)
+    return results
@@ -0,0 +1,45 @@
+# app/repos/write_behind.py
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LoginTouchQueue:
+    """
+    Cola en proceso de actualizaciones solo-timestamp (uid -> last_login).
+    Coalesce por uid: varios logins del mismo usuario entre flushes son una escritura.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, uid: str, ts: int) -> None:
+        with self._lock:
+            if ts > self._pending.get(uid, 0):
+                self._pending[uid] = ts
+
+    def drain(self) -> Dict[str, int]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def requeue(self, pending: Dict[str, int]) -> None:
+        for uid, ts in pending.items():
+            self.add(uid, ts)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+async def flush_periodically(flush: Callable[[], Awaitable[int]], interval: float) -> None:
+    """Bucle para lifespan: flush cada `interval` segundos hasta que se cancele la tarea."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush()
+        except Exception as e:
+            logger.warning("write-behind flush failed (will retry): %s", e)
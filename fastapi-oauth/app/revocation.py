@@ -0,0 +1,214 @@
+# app/revocation.py
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from app.config import settings
+from app.firebase import get_firestore
+from app.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Solapamiento al releer eventos: tolera relojes desfasados entre réplicas
+# (un evento escrito "en el pasado" por otra réplica no se pierde).
+_SKEW_MS = 5000
+
+
+def _event_ttl_seconds() -> int:
+    # Un evento solo importa mientras pueda existir un access token emitido antes que él
+    return settings.jwt_expires_minutes * 60 + 60
+
+
+def _event_id(event: Dict[str, Any]) -> str:
+    # id del doc en Firestore (uno por jti/uid) y desempate del cursor de sync
+    return f"{event['kind']}:{event['key']}"
+
+
+class RevocationStore(Protocol):
+    def add(self, events: List[Dict[str, Any]]) -> None: ...
+    def since(self, after: Tuple[int, str], limit: int) -> List[Dict[str, Any]]:
+        """
+        Eventos con (created_at, id) > after, en orden ascendente. El id desempata:
+        un lote de revoke_user_tokens comparte created_at y puede ocupar varias páginas.
+        """
+        ...
+
+
+class InMemoryRevocationStore:
+    """Un solo proceso (desarrollo/benchmarks): la lista local ya es la fuente de verdad."""
+
+    def __init__(self) -> None:
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, events: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._events.extend(dict(e) for e in events)
+
+    def since(self, after: Tuple[int, str], limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = sorted((e for e in self._events if (e["created_at"], _event_id(e)) > after),
+                         key=lambda e: (e["created_at"], _event_id(e)))
+        return out[:limit]
+
+
+class FirestoreRevocationStore:
+    """
+    Un doc por jti y uno por uid (el not-before más reciente pisa al anterior), así la
+    colección queda acotada. 'expire_at' (Timestamp) sirve para una política TTL de Firestore.
+    """
+
+    def _col(self):
+        return get_firestore().collection(settings.firestore_revocations_collection)
+
+    def add(self, events: List[Dict[str, Any]]) -> None:
+        fs = get_firestore()
+        col = self._col()
+        for i in range(0, len(events), 500):  # límite de WriteBatch
+            batch = fs.batch()
+            for e in events[i:i + 500]:
+                expire_at = datetime.fromtimestamp(e["expires_at"], tz=timezone.utc)
+                batch.set(col.document(_event_id(e)), {**e, "expire_at": expire_at})
+            batch.commit()
+
+    def since(self, after: Tuple[int, str], limit: int) -> List[Dict[str, Any]]:
+        created_at, doc_id = after
+        q = self._col().order_by("created_at").order_by("__name__")
+        if doc_id:
+            q = q.start_after({"created_at": created_at, "__name__": doc_id})
+        else:
+            q = q.where("created_at", ">", created_at)
+        return [snap.to_dict() or {} for snap in q.limit(limit).stream()]
+
+
+def _not_before_ms(event: Dict[str, Any]) -> int:
+    # eventos escritos antes de not_before_ms: fin de su segundo (cubre los tokens de ese segundo)
+    if "not_before_ms" in event:
+        return int(event["not_before_ms"])
+    return int(event.get("not_before", 0)) * 1000 + 999
+
+
+class RevocationList:
+    """
+    Deny-list en memoria del worker:
+      - jti revocados (logout)          -> dict jti -> expires_at
+      - not-before por uid (roles/baja) -> dict uid -> (nbf_ms, expires_at)
+    is_revoked() son dos lookups en dicts: O(1) y sin I/O.
+    """
+
+    def __init__(self) -> None:
+        self._jti: Dict[str, int] = {}
+        self._nbf: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.cursor_ms = 0
+        self.synced_at: Optional[float] = None
+
+    def apply(self, events: Iterable[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock:
+            for e in events:
+                self.cursor_ms = max(self.cursor_ms, int(e.get("created_at", 0)))
+                if e.get("expires_at", 0) <= now:
+                    continue
+                if e["kind"] == "jti":
+                    self._jti[e["key"]] = e["expires_at"]
+                elif e["kind"] == "uid":
+                    nbf_ms = _not_before_ms(e)
+                    current = self._nbf.get(e["key"])
+                    if current is None or nbf_ms >= current[0]:
+                        self._nbf[e["key"]] = (nbf_ms, e["expires_at"])
+
+    def is_revoked(self, uid: str, jti: Optional[str], issued_ms: int) -> bool:
+        nbf = self._nbf.get(uid)
+        # en ms y con <=: un token emitido en el mismo instante que el evento también cae
+        if nbf is not None and issued_ms <= nbf[0]:
+            return True
+        return jti is not None and jti in self._jti
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            self._jti = {k: exp for k, exp in self._jti.items() if exp > now}
+            self._nbf = {k: v for k, v in self._nbf.items() if v[1] > now}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked_jti": len(self._jti),
+            "uid_not_before": len(self._nbf),
+            "cursor_ms": self.cursor_ms,
+            "synced_at": self.synced_at,
+        }
+
+
+def _make_store() -> RevocationStore:
+    if settings.revocation_store == "memory":
+        return InMemoryRevocationStore()
+    return FirestoreRevocationStore()
+
+
+revocation_store: RevocationStore = _make_store()
+revocations = RevocationList()
+
+
+def _publish(events: List[Dict[str, Any]]) -> None:
+    if not events:
+        return
+    with timed("revocations", "add"):
+        revocation_store.add(events)
+    revocations.apply(events)  # efecto inmediato en este worker; el resto lo ve al sincronizar
+
+
+def revoke_user_tokens(uids: Iterable[str]) -> None:
+    """
+    Evento not-before por uid: invalida todos los access tokens emitidos antes de ahora
+    (cambio de roles o desactivación). El cliente obtiene uno nuevo con su refresh token.
+    """
+    now = time.time()
+    _publish([{
+        "kind": "uid", "key": uid, "not_before_ms": int(now * 1000),
+        "expires_at": int(now) + _event_ttl_seconds(), "created_at": int(now * 1000),
+    } for uid in dict.fromkeys(uids)])
+
+
+def revoke_token(jti: str, expires_at: Optional[int] = None) -> None:
+    """Revoca un access token concreto (logout) hasta su expiración."""
+    now = time.time()
+    _publish([{
+        "kind": "jti", "key": jti,
+        "expires_at": int(expires_at or now + _event_ttl_seconds()), "created_at": int(now * 1000),
+    }])
+
+
+def sync_revocations(page_size: int = 500) -> int:
+    """Trae los eventos nuevos desde el último cursor (con solape por desfase de relojes)."""
+    if revocations.synced_at is None:
+        # arranque: solo interesan eventos que aún puedan afectar a tokens vigentes
+        start = int((time.time() - _event_ttl_seconds()) * 1000)
+        revocations.cursor_ms = min(revocations.cursor_ms, start) if revocations.cursor_ms else start
+    after: Tuple[int, str] = (revocations.cursor_ms - _SKEW_MS, "")
+    total = 0
+    while True:
+        with timed("revocations", "since"):
+            events = revocation_store.since(after, page_size)
+        revocations.apply(events)
+        total += len(events)
+        if len(events) < page_size:
+            break
+        # cursor (created_at, id): con solo created_at se saltaría el resto de un lote con el mismo ms
+        after = (events[-1]["created_at"], _event_id(events[-1]))
+    revocations.prune()
+    revocations.synced_at = time.time()
+    return total
+
+
+async def sync_periodically(sync: Callable[[], Awaitable[int]], interval: float) -> None:
+    """Bucle para lifespan: sincroniza cada `interval` segundos hasta que se cancele la tarea."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync()
+        except Exception as e:
+            logger.warning("revocation sync failed (keeping current deny-list): %s", e)
@@ -1,30 +1,75 @@
 # app/routers/auth.py
-from fastapi import APIRouter, Request, HTTPException, Depends
-from authlib.integrations.starlette_client import OAuth, OAuthError
+import logging
+from typing import Optional
 
+from fastapi import APIRouter, Request, Response, HTTPException, Depends
+
+from app import http_client
+from app.admission import admit_login, login_admission
 from app.config import settings
-from app.security import create_access_token
-from app.schemas import TokenOut, MeOut, StaffOut
-from app.firebase import get_auth
+from app.security import create_access_token, user_claims
+from app.etag import CACHE_HEADERS, etag_matches, not_modified, user_etag
+from app.schemas import AuthUser, TokenOut, MeOut, StaffOut, RefreshIn, LogoutIn
+from app.services import firebase_users
+from app.services.firebase_users import ensure_firebase_user
+from app.authz import require_roles, Role
+from app.executor import run_blocking
+from app.metrics import OIDC_USERINFO_FALLBACK, timed
+from app.profiling import span
+from app.singleflight import login_flight
 from app.repos.users_repo import (
     create_or_update_from_google,
     get_user_doc,
+    peek_user_doc,
+    to_user_out,
+    user_doc_cache,
+)
+from app.refresh_tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
 )
-from app.deps import current_user  # valida tu JWT y carga usuario desde Firestore
+from app.revocation import revocations, revoke_token
+from app.deps import current_user, principal_cache  # valida tu JWT y carga usuario desde Firestore
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # ──────────────────────────────────────────────────────────────────────────────
 # OAuth cliente (Google)
 # ──────────────────────────────────────────────────────────────────────────────
-oauth = OAuth()
-oauth.register(
-    name="google",
-    client_id=settings.google_client_id,
-    client_secret=settings.google_client_secret,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={"scope": "openid email profile"},
-)
+# Authlib se importa al crear el cliente (warm-up del lifespan o primer login), no al
+# cargar el módulo. Usa el transporte saliente compartido si ya existe (app/http_client.py).
+_oauth = None
+
+
+def google_client():
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+
+        oauth = OAuth()
+        oauth.register(
+            name="google",
+            client_id=settings.google_client_id,
+            client_secret=settings.google_client_secret,
+            server_metadata_url=settings.google_discovery_url,  # precargado en lifespan (app/oidc.py)
+            client_kwargs={"scope": "openid email profile", **http_client.oauth_client_kwargs()},
+        )
+        _oauth = oauth
+    return _oauth.google
+
+# Claims que el callback necesita; sub/email son imprescindibles, el resto es perfil opcional
+_PROFILE_CLAIMS = ("sub", "email", "email_verified", "name", "given_name", "family_name", "picture")
+_REQUIRED_CLAIMS = ("sub", "email")
+
+
+def _profile_from_claims(claims) -> dict:
+    profile = {k: claims.get(k) for k in _PROFILE_CLAIMS}
+    profile["given_name"] = profile["given_name"] or (profile["name"] or "").split(" ")[0]
+    return profile
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Rutas
@@ -34,98 +79,160 @@ async def google_login(request: Request):
     """
     Inicia el flujo de OAuth en Google (redirección al consentimiento).
     """
-    return await oauth.google.authorize_redirect(request, settings.google_redirect_uri)
+    return await google_client().authorize_redirect(request, settings.google_redirect_uri)
 
 
-@router.get("/google/callback", response_model=MeOut)
+@router.get("/google/callback", response_model=MeOut, dependencies=[Depends(admit_login)],
+            responses={503: {"description": "Sobrecarga: reintentar tras Retry-After"}})
 async def google_callback(request: Request):
     """
     Callback de Google:
-      1) Intercambia 'code' por tokens y userinfo
+      1) Intercambia 'code' por tokens; perfil desde el id_token (userinfo solo si faltan claims)
       2) Asegura usuario en Firebase Auth
       3) Upsert del perfil en Firestore (colección 'users')
       4) Emite JWT propio con sub=uid y roles
     """
-    # 1) Intercambiar code por tokens y obtener userinfo
+    from authlib.integrations.starlette_client import OAuthError
+    from authlib.jose.errors import JoseError
+
+    google = google_client()
+    # 1) Intercambiar code por tokens; el perfil sale del id_token (una sola llamada saliente)
+    #    Spans del profiler (app/profiling.py): google.token_exchange / id_token_verify / userinfo vía timed()
     try:
-        token = await oauth.google.authorize_access_token(request)
-
-        userinfo = None
-        # intentar decodificar id_token primero (OIDC)
-        if token and "id_token" in token:
-            try:
-                userinfo = await oauth.google.parse_id_token(request, token)
-            except Exception:
-                userinfo = None
-
-        # fallback: userinfo endpoint
-        if not userinfo:
-            userinfo_endpoint = oauth.google.server_metadata.get(
+        with timed("google", "token_exchange"):
+            # Authlib valida el id_token (firma con el JWKS cacheado en app/oidc.py + nonce)
+            # y deja los claims en token["userinfo"]
+            token = await google.authorize_access_token(request)
+
+        claims = token.get("userinfo")
+        if claims is None and "id_token" in token:
+            # Sin nonce en la sesión Authlib no lo valida: validación local contra el mismo JWKS
+            with timed("google", "id_token_verify"):
+                claims = await google.parse_id_token(token, nonce=None)
+
+        missing = [c for c in _REQUIRED_CLAIMS if not (claims or {}).get(c)]
+        if missing:
+            # fallback explícito (y contado): solo si faltan claims imprescindibles
+            OIDC_USERINFO_FALLBACK.labels("no_id_token" if claims is None else "missing_claims").inc()
+            logger.info("id_token without %s; calling userinfo endpoint", ",".join(missing))
+            userinfo_endpoint = google.server_metadata.get(
                 "userinfo_endpoint",
                 "https://openidconnect.googleapis.com/v1/userinfo"
             )
-            resp = await oauth.google.get(userinfo_endpoint, token=token)
+            with timed("google", "userinfo"):
+                resp = await google.get(userinfo_endpoint, token=token)
             data = resp.json()
-            userinfo = {
-                "sub": data.get("sub"),
-                "email": data.get("email"),
-                "name": data.get("name"),
-                "given_name": data.get("given_name") or (data.get("name") or "").split(" ")[0],
-                "family_name": data.get("family_name"),
-                "picture": data.get("picture"),
-                "email_verified": data.get("email_verified"),
-            }
-            if not userinfo.get("sub"):
-                raise HTTPException(status_code=400, detail="Google userinfo sin 'sub'")
+            if claims and claims.get("sub") and data.get("sub") != claims["sub"]:
+                raise HTTPException(status_code=400, detail="userinfo 'sub' no coincide con el id_token")
+            claims = {**data, **{k: v for k, v in (claims or {}).items() if v is not None}}
+
+        userinfo = _profile_from_claims(claims)
+        if not userinfo.get("sub"):
+            raise HTTPException(status_code=400, detail="Google userinfo sin 'sub'")
     except OAuthError as e:
         # Error propio de Authlib/OAuth
         raise HTTPException(
             status_code=400,
             detail={"error": e.error, "description": e.description, "uri": getattr(e, "uri", None)},
         )
+    except JoseError as e:
+        # Firma/nonce/aud inválidos: es un fallo de autenticación, no motivo para llamar a userinfo
+        logger.warning("Google id_token rejected: %s", e)
+        raise HTTPException(status_code=400, detail={"error": "invalid_id_token", "description": str(e)})
 
-    # 2) Firebase Auth: asegurar el usuario (uid = sub de Google)
-    fb_auth = get_auth()
+    # 2) + 3) Aprovisionamiento (Firebase Auth + upsert en Firestore), de-duplicado por uid:
+    #    doble click, reintentos o varias pestañas comparten una sola ejecución
     uid = userinfo["sub"]
 
+    async def _provision():
+        # 2) Firebase Auth: asegurar el usuario (uid = sub de Google)
+        #    El SDK es bloqueante: se ejecuta en su propio pool para no congelar el event loop
+        #    Solo se llama a Identity Toolkit si el perfil cambió (ver services/firebase_users.py)
+        with span("callback.firebase_auth"):
+            await run_blocking("firebase_auth", ensure_firebase_user, uid, userinfo)
+        # 3) Firestore: upsert transaccional del perfil; devuelve el doc final con roles
+        with span("callback.firestore_upsert"):
+            return await run_blocking("firestore", create_or_update_from_google, userinfo, uid)
+
+    with span("callback.provision"):  # incluye la espera si otra request ya aprovisiona este uid
+        doc = await login_flight.do(uid, _provision)
+    if not doc.get("active", True):
+        # cuenta dada de baja (PUT /auth/users/{uid}/active): login de Google válido, pero sin tokens
+        raise HTTPException(status_code=403, detail="Cuenta desactivada")
+    user_out = to_user_out(doc)
+
+    # 4) Emite tu JWT propio incluyendo roles (útil para BFF/UI) + bitmask/versión de roles
+    with span("callback.issue_tokens"):
+        access = create_access_token(user_claims(uid, doc))
+        refresh = await run_blocking("firestore", issue_refresh_token, uid)
+
+    return {"user": user_out, "token": TokenOut(access_token=access, refresh_token=refresh)}
+
+
+@router.post("/token/refresh", response_model=TokenOut)
+async def refresh_token(payload: RefreshIn):
+    """
+    Renueva el access token sin repetir el flujo de Google: un lookup del refresh
+    token (rotación + detección de reuso) y una firma local.
+    """
     try:
-        fb_auth.get_user(uid)
-        # si ya existe, refrescamos datos básicos
-        fb_auth.update_user(
-            uid=uid,
-            email=userinfo.get("email"),
-            email_verified=bool(userinfo.get("email_verified")),
-            display_name=userinfo.get("name"),
-            photo_url=userinfo.get("picture"),
-            disabled=False,
-        )
-    except Exception:
-        # si no existe, lo creamos
-        fb_auth.create_user(
-            uid=uid,
-            email=userinfo.get("email"),
-            email_verified=bool(userinfo.get("email_verified")),
-            display_name=userinfo.get("name"),
-            photo_url=userinfo.get("picture"),
-            disabled=False,
-        )
+        uid, new_refresh = await run_blocking("firestore", rotate_refresh_token, payload.refresh_token)
+    except RefreshTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
 
-    # 3) Firestore: upsert del perfil en colección users
-    user_out = create_or_update_from_google(userinfo, uid)
+    doc = await run_blocking("firestore", get_user_doc, uid)  # read-through cache
+    if not doc or not doc.get("active", True):
+        raise HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
 
-    # Cargar doc completo para extraer roles
-    doc = get_user_doc(uid) or {}
-    roles = doc.get("roles", ["EMPLOYEE"])
+    access = create_access_token(user_claims(uid, doc))
+    return TokenOut(access_token=access, refresh_token=new_refresh)
 
-    # 4) Emite tu JWT propio incluyendo roles (útil para BFF/UI)
-    access = create_access_token({"sub": uid, "email": userinfo.get("email"), "roles": roles})
 
-    return {"user": user_out, "token": TokenOut(access_token=access)}
+@router.post("/logout", status_code=204)
+async def logout(payload: Optional[LogoutIn] = None, user: AuthUser = Depends(current_user)):
+    """
+    Revoca el access token actual (jti en la deny-list de todos los workers)
+    y, si se envía, la familia del refresh token.
+    """
+    if user.jti:
+        await run_blocking("firestore", revoke_token, user.jti, user.exp)
+    if payload and payload.refresh_token:
+        await run_blocking("firestore", revoke_refresh_token, payload.refresh_token)
+    return Response(status_code=204)
 
 
-@router.get("/me", response_model=StaffOut)
-def me(user: StaffOut = Depends(current_user)):
+@router.get("/me", response_model=StaffOut, responses={304: {"description": "Sin cambios (If-None-Match)"}})
+def me(request: Request, response: Response, user: AuthUser = Depends(current_user)):
     """
     Devuelve el perfil del usuario autenticado (según tu JWT + Firestore).
+    Con If-None-Match responde 304 antes de serializar; si el principal venía de
+    la cache (y el doc está en la cache local o no se conoce uno más nuevo) no
+    hay lectura de Firestore.
+    """
+    cached_doc = peek_user_doc(user.uid)
+    etag = user_etag(cached_doc) if cached_doc is not None else user.etag
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    doc = get_user_doc(user.uid)  # read-through cache
+    if not doc:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    response.headers.update({"ETag": user_etag(doc), **CACHE_HEADERS})
+    return to_user_out(doc)
+
+
+@router.get("/stats", dependencies=[Depends(require_roles(Role.HR_ADMIN))])
+def stats():
+    """
+    Contadores del camino de login/auth: llamadas a Firebase Auth por login
+    (y las evitadas) y estado de las caches en proceso.
     """
-    return user
+    return {
+        "firebase_auth": firebase_users.stats(),
+        "principal_cache": principal_cache.stats(),
+        "user_doc_cache": user_doc_cache.stats(),
+        "login_singleflight": login_flight.stats(),
+        "outbound_http": http_client.stats(),
+        "revocations": revocations.stats(),
+        "login_admission": login_admission.stats(),
+    }
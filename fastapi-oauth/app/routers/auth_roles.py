@@ -1,10 +1,13 @@
 # app/routers/auth_roles.py
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, EmailStr
-from typing import List
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, ValidationError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.authz import require_roles, Role
-from app.deps import current_user
-from app.repos.users_repo import set_roles, get_user_doc
+from app.config import settings
+from app.executor import run_blocking
+from app.repos.users_repo import set_roles, set_roles_bulk, get_user_doc
 
 router = APIRouter(prefix="/auth/roles", tags=["roles"])
 
@@ -12,10 +15,92 @@ class SetRolesIn(BaseModel):
     uid: str
     roles: List[Role]
 
+class BulkRoleItem(BaseModel):
+    uid: Optional[str] = None
+    email: Optional[EmailStr] = None
+    roles: List[Role]
+
 @router.post("/set", dependencies=[Depends(require_roles(Role.HR_ADMIN))])
-def set_user_roles(payload: SetRolesIn, _=Depends(current_user)):
+def set_user_roles(payload: SetRolesIn):
     doc = get_user_doc(payload.uid)
     if not doc:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     updated = set_roles(payload.uid, [r.value for r in payload.roles])
     return {"ok": True, "user": {"uid": payload.uid, "roles": updated.get("roles", [])}}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Asignación masiva
+# ──────────────────────────────────────────────────────────────────────────────
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return {"__error__": f"JSON inválido: {e}"}
+
+async def _read_items(request: Request) -> List[Any]:
+    if "ndjson" in request.headers.get("content-type", ""):
+        items: List[Any] = []
+        buf = b""
+        async for chunk in request.stream():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            items.extend(_parse_line(l) for l in lines if l.strip())
+            if len(items) > settings.roles_bulk_max_items:
+                break
+        if buf.strip():
+            items.append(_parse_line(buf))
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body JSON inválido")
+        items = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Se esperaba una lista de items")
+    if len(items) > settings.roles_bulk_max_items:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.roles_bulk_max_items} items por request")
+    return items
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode()
+
+async def _apply_bulk(items: List[Any]) -> AsyncIterator[bytes]:
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+
+    async def flush():
+        entries = [e for _, e in chunk]
+        results = await run_blocking("firestore", set_roles_bulk, entries)
+        return [_ndjson({"index": i, **r}) for (i, _), r in zip(chunk, results)]
+
+    for index, raw in enumerate(items):
+        if isinstance(raw, dict) and "__error__" in raw:
+            yield _ndjson({"index": index, "ok": False, "error": raw["__error__"]})
+            continue
+        try:
+            item = BulkRoleItem.model_validate(raw)
+        except ValidationError as e:
+            yield _ndjson({"index": index, "ok": False, "error": e.errors(include_url=False)})
+            continue
+        if not item.uid and not item.email:
+            yield _ndjson({"index": index, "ok": False, "error": "Falta 'uid' o 'email'"})
+            continue
+        chunk.append((index, {"uid": item.uid, "email": item.email, "roles": [r.value for r in item.roles]}))
+        if len(chunk) >= settings.roles_bulk_chunk_size:
+            for line in await flush():
+                yield line
+            chunk = []
+    if chunk:
+        for line in await flush():
+            yield line
+
+@router.post("/bulk", dependencies=[Depends(require_roles(Role.HR_ADMIN))])
+async def bulk_set_user_roles(request: Request):
+    """
+    Asignación masiva de roles.
+    Body: lista JSON (o {"items": [...]}) o NDJSON (Content-Type: application/x-ndjson),
+    un {"uid" | "email", "roles"} por item. Se escribe en WriteBatch por chunks y
+    la respuesta es NDJSON con un resultado por item ({"index", "ok", ...}).
+    """
+    items = await _read_items(request)
+    return StreamingResponse(_apply_bulk(items), media_type="application/x-ndjson")
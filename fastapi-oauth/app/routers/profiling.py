@@ -0,0 +1,37 @@
+# app/routers/profiling.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.authz import require_roles, Role
+from app.config import settings
+from app.executor import run_blocking
+from app.profiling import list_traces, profile_path
+
+router = APIRouter(
+    prefix="/auth/profiling",
+    tags=["profiling"],
+    dependencies=[Depends(require_roles(Role.HR_ADMIN))],
+)
+
+
+@router.get("/traces")
+async def recent_traces(
+    limit: int = Query(50, ge=1, le=500),
+    slow_only: bool = Query(True, description="false => también las muestreadas al azar"),
+):
+    """
+    Trazas recientes (todos los workers) con sus spans por fase. El perfil
+    completo se descarga en /auth/profiling/traces/{id}/profile.
+    """
+    traces = await run_blocking("profiling", list_traces, limit, slow_only)
+    return {"enabled": settings.profiling_enabled, "slow_ms": settings.profiling_slow_ms, "items": traces}
+
+
+@router.get("/traces/{trace_id}/profile")
+async def trace_profile(trace_id: str):
+    """Archivo speedscope (abrir en https://www.speedscope.app) o stacks colapsados (flamegraph.pl)."""
+    path = profile_path(trace_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Traza no encontrada")
+    media_type = "application/json" if path.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=path.rsplit("/", 1)[-1])
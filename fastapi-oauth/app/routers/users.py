@@ -0,0 +1,85 @@
+# app/routers/users.py
+import json
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.authz import require_roles, Role
+from app.config import settings
+from app.etag import CACHE_HEADERS, etag_matches, not_modified, user_etag
+from app.executor import run_blocking
+from app.repos.users_repo import USER_LIST_FIELDS, get_user_doc, list_users, set_active, to_user_out
+from app.schemas import UserOut, SetActiveIn
+
+router = APIRouter(prefix="/auth/users", tags=["users"])
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(USER_LIST_FIELDS)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - set(USER_LIST_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no soportados: {', '.join(unknown)}")
+    return wanted
+
+
+async def _export_ndjson(fields: List[str], role: Optional[str], active: Optional[bool]) -> AsyncIterator[bytes]:
+    # Una página en memoria a la vez: el consumo no depende del tamaño de la colección
+    cursor: Optional[str] = None
+    while True:
+        page, cursor = await run_blocking(
+            "firestore", list_users, fields, role, active, cursor, settings.users_export_page_size)
+        if page:
+            yield "".join(json.dumps(doc, default=str) + "\n" for doc in page).encode()
+        if not cursor:
+            break
+
+
+@router.get("", dependencies=[Depends(require_roles(Role.HR_ADMIN))])
+async def list_users_endpoint(
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    role: Optional[Role] = None,
+    active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Campos separados por comas (proyección)"),
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+):
+    """
+    Directorio de usuarios para HR:
+      - json   -> una página ({"items", "next_cursor"}); pedir la siguiente con ?cursor=
+      - ndjson -> export completo en streaming (una línea por usuario)
+    """
+    projected = _parse_fields(fields)
+    role_value = role.value if role else None
+    if fmt == "ndjson":
+        return StreamingResponse(_export_ndjson(projected, role_value, active),
+                                 media_type="application/x-ndjson")
+    items, next_cursor = await run_blocking(
+        "firestore", list_users, projected, role_value, active, cursor,
+        min(limit, settings.users_list_max_limit))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/{uid}", response_model=UserOut, dependencies=[Depends(require_roles(Role.HR_ADMIN))],
+            responses={304: {"description": "Sin cambios (If-None-Match)"}})
+async def get_user_endpoint(uid: str, request: Request, response: Response):
+    """Lectura puntual (read-through cache) con ETag: un 304 no serializa nada."""
+    doc = await run_blocking("firestore", get_user_doc, uid)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    etag = user_etag(doc)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers.update({"ETag": etag, **CACHE_HEADERS})
+    return to_user_out(doc)
+
+
+@router.put("/{uid}/active", response_model=UserOut, dependencies=[Depends(require_roles(Role.HR_ADMIN))])
+async def set_user_active(uid: str, payload: SetActiveIn):
+    """Alta/baja de una cuenta. Una baja revoca al momento los access tokens del usuario."""
+    doc = await run_blocking("firestore", set_active, uid, payload.active)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return to_user_out(doc)
@@ -1,5 +1,5 @@
 # app/schemas.py
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime, date
 from enum import Enum
 from typing import Optional
@@ -11,10 +11,34 @@ class Role(str, Enum):
     MANAGER = "MANAGER"
     EMPLOYEE = "EMPLOYEE"
 
+# Bits de rol para el claim compacto 'rm' del JWT (no reordenar: viaja en tokens emitidos)
+ROLE_BITS = {"HR_ADMIN": 1 << 0, "MANAGER": 1 << 1, "EMPLOYEE": 1 << 2}
+
+def roles_to_mask(roles) -> int:
+    mask = 0
+    for r in roles or []:
+        mask |= ROLE_BITS.get(getattr(r, "value", r), 0)
+    return mask
+
+def mask_to_roles(mask: int) -> List[str]:
+    return [name for name, bit in ROLE_BITS.items() if mask & bit]
+
 class AuthUser(BaseModel):
     uid: str
     email: Optional[str] = None
     roles: List[str] = []
+    role_mask: int = 0
+    etag: Optional[str] = None  # ETag del doc con el que se construyó (GET /auth/me condicional)
+    jti: Optional[str] = None   # id del token (deny-list de app/revocation.py)
+    iat_ms: int = 0             # emisión en ms (comparación con el not-before de revocación)
+    exp: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _derive_role_mask(self) -> "AuthUser":
+        # construido solo con 'roles' (overrides, tests, código antiguo): require_roles usa la máscara
+        if not self.role_mask and self.roles:
+            self.role_mask = roles_to_mask(self.roles)
+        return self
     
 # === Documento de usuario (Firestore) ===
 class UserDoc(BaseModel):
@@ -29,9 +53,11 @@ class UserDoc(BaseModel):
     provider: str = "google"
     provider_sub: Optional[str] = None
     roles: List[str] = []
+    roles_version: int = 0  # epoch ms del último cambio de roles (claim 'rv')
     created_at: Optional[int] = None  # epoch
     updated_at: Optional[int] = None  # epoch
     last_login: Optional[int] = None  # epoch
+    profile_fp: Optional[str] = None  # huella de los campos de perfil (evita reescrituras sin cambios)
 
 # === Salidas compatibles con tu API anterior ===
 class UserOut(BaseModel):
@@ -49,6 +75,16 @@ StaffOut = UserOut
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+class RefreshIn(BaseModel):
+    refresh_token: str
+
+class LogoutIn(BaseModel):
+    refresh_token: Optional[str] = None
+
+class SetActiveIn(BaseModel):
+    active: bool
 
 class MeOut(BaseModel):
     user: StaffOut
@@ -1,10 +1,35 @@
 # app/security.py
+import secrets
+import time
 from datetime import datetime, timedelta
-from jose import jwt
 from app.config import settings
+from app.keys import key_ring
+from app.schemas import roles_to_mask
+from app.metrics import timed
 
 def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes or settings.jwt_expires_minutes)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    # jti: revocación individual (logout); iat_ms: comparación con el not-before por uid
+    # (en ms: con iat en segundos un token del mismo segundo que el evento pasaría)
+    now = time.time()
+    to_encode.update({"exp": expire, "iat": int(now), "iat_ms": int(now * 1000),
+                      "jti": secrets.token_urlsafe(12)})
+    with timed("jwt", "encode"):
+        return key_ring.sign(to_encode)
+
+def decode_access_token(token: str) -> dict:
+    """Verifica firma (por 'kid') y expiración. Lanza jose.JWTError si no es válido."""
+    with timed("jwt", "decode"):
+        return key_ring.decode(token)
+
+def user_claims(uid: str, doc: dict) -> dict:
+    """Claims de nuestro JWT: roles legibles + bitmask 'rm' y versión de roles 'rv'."""
+    roles = doc.get("roles", ["EMPLOYEE"])
+    return {
+        "sub": uid,
+        "email": doc.get("email"),
+        "roles": roles,
+        "rm": roles_to_mask(roles),
+        "rv": int(doc.get("roles_version", 0)),
+    }
@@ -1,6 +1,8 @@
 # app/services/auth_service.py
-from sqlalchemy.orm import Session
-from app.models import Staff, OAuthAccount
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from app.models import Staff, OAuthAccount, StaffRole
 from app.schemas import StaffOut
 from app.config import settings
 from typing import TypedDict
@@ -17,14 +19,38 @@ class GoogleProfile(TypedDict):
 PROVIDER = "google"
 
 
-def get_or_create_staff_from_google(db: Session, profile: GoogleProfile) -> Staff:
-    # 1) ¿ya existe vínculo oauth?
-    link = db.query(OAuthAccount).filter_by(provider=PROVIDER, provider_sub=profile["sub"]).first()
+def load_oauth_account(db: Session, provider_sub: str) -> OAuthAccount | None:
+    """Vínculo OAuth + staff + roles en una sola query (índice único provider/provider_sub)."""
+    stmt = (
+        select(OAuthAccount)
+        .options(joinedload(OAuthAccount.staff).joinedload(Staff.roles))
+        .where(OAuthAccount.provider == PROVIDER, OAuthAccount.provider_sub == provider_sub)
+    )
+    return db.execute(stmt).unique().scalar_one_or_none()
+
+
+def _needs_admin_bootstrap(db: Session) -> bool:
+    return db.scalar(select(StaffRole.staff_id).where(StaffRole.role == "HR_ADMIN").limit(1)) is None
+
+
+def get_or_create_staff_from_google(db: Session, profile: GoogleProfile) -> OAuthAccount:
+    now = datetime.utcnow()
+
+    # 1) ¿ya existe vínculo oauth? (login recurrente: una query)
+    link = load_oauth_account(db, profile["sub"])
     if link:
-        return link.staff
+        staff = link.staff
+        staff.first_name = profile["given_name"] or staff.first_name
+        staff.last_name = profile["family_name"] or staff.last_name
+        staff.email = profile["email"]
+        link.last_login = now
+        db.commit()
+        return link
 
     # 2) ¿existe staff con ese email? (puede ya existir en sakila)
-    staff = db.query(Staff).filter(Staff.email == profile["email"]).first()
+    staff = db.execute(
+        select(Staff).options(joinedload(Staff.roles)).where(Staff.email == profile["email"])
+    ).unique().scalars().first()
     if not staff:
         # Crear un nuevo staff con defaults configurables
         # username: hasta 16 chars en sakila; derivamos de email si cabe
@@ -40,12 +66,16 @@ def get_or_create_staff_from_google(db: Session, profile: GoogleProfile) -> Staf
         db.add(staff)
         db.flush()  # para obtener staff_id
 
+    if not staff.roles:
+        # ⛳ primer usuario del sistema => HR_ADMIN
+        role = "HR_ADMIN" if _needs_admin_bootstrap(db) else "EMPLOYEE"
+        staff.roles.append(StaffRole(role=role))
+
     # 3) crear vínculo oauth
-    link = OAuthAccount(provider=PROVIDER, provider_sub=profile["sub"], staff_id=staff.staff_id)
+    link = OAuthAccount(provider=PROVIDER, provider_sub=profile["sub"], staff=staff, last_login=now)
     db.add(link)
     db.commit()
-    db.refresh(staff)
-    return staff
+    return link
 
 
 def staff_to_out(staff: Staff) -> StaffOut:
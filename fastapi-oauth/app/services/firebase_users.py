@@ -0,0 +1,87 @@
+# app/services/firebase_users.py
+import hashlib
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict
+
+from app.cache import TTLCache
+from app.config import settings
+from app.firebase import get_auth
+from app.metrics import register_cache, timed
+
+# uid -> huella del perfil que Firebase Auth ya tiene (sincronizado en un login reciente)
+profile_fp_cache = TTLCache(
+    max_size=settings.user_cache_max_size,
+    ttl_seconds=settings.firebase_profile_cache_ttl_seconds,
+)
+register_cache("firebase_profile_fp", profile_fp_cache.stats)
+
+# Llamadas a Identity Toolkit (y las evitadas), para verificar el ahorro por login
+calls: Counter = Counter()
+_calls_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _calls_lock:
+        calls[key] += 1
+
+
+def _wanted(userinfo: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "email": userinfo.get("email"),
+        "email_verified": bool(userinfo.get("email_verified")),
+        "display_name": userinfo.get("name"),
+        "photo_url": userinfo.get("picture"),
+        "disabled": False,
+    }
+
+
+def _fingerprint(wanted: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(wanted, sort_keys=True).encode()).hexdigest()
+
+
+def ensure_firebase_user(uid: str, userinfo: Dict[str, Any]) -> None:
+    """
+    Asegura el usuario en Firebase Auth (uid = sub de Google) con el mínimo de RPCs:
+      - huella en cache igual => 0 llamadas
+      - get_user + update_user solo con los campos que cambiaron (o ninguno)
+      - create_user si no existe
+    """
+    fb_auth = get_auth()
+    wanted = _wanted(userinfo)
+    fp = _fingerprint(wanted)
+    _count("logins")
+    if profile_fp_cache.get(uid) == fp:
+        _count("skipped_get_user")
+        return
+
+    not_found = getattr(fb_auth, "UserNotFoundError", Exception)
+    try:
+        _count("get_user")
+        with timed("firebase_auth", "get_user"):
+            record = fb_auth.get_user(uid)
+    except not_found:
+        # si no existe, lo creamos
+        _count("create_user")
+        with timed("firebase_auth", "create_user"):
+            fb_auth.create_user(uid=uid, **wanted)
+        profile_fp_cache.set(uid, fp)
+        return
+
+    changed = {k: v for k, v in wanted.items() if getattr(record, k, None) != v}
+    if changed:
+        _count("update_user")
+        with timed("firebase_auth", "update_user"):
+            fb_auth.update_user(uid, **changed)
+    else:
+        _count("skipped_update_user")
+    profile_fp_cache.set(uid, fp)
+
+
+def stats() -> Dict[str, Any]:
+    with _calls_lock:
+        snapshot = dict(calls)
+    logins = snapshot.get("logins", 0)
+    rpcs = sum(snapshot.get(k, 0) for k in ("get_user", "update_user", "create_user"))
+    return {**snapshot, "rpcs_per_login": (rpcs / logins) if logins else 0.0}
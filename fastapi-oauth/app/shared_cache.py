@@ -0,0 +1,193 @@
+# app/shared_cache.py
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from app.cache import TTLCache
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks entre procesos (modo multi-worker no soportado)
+    fcntl = None
+
+# Cabecera de cada slot: seq (seqlock), digest de la clave, expiración (epoch), largo y crc32 del payload
+_HEADER = struct.Struct("<I16sdII")
+_SEQ = struct.Struct("<I")
+HEADER_SIZE = _HEADER.size
+
+
+class SharedSlotCache:
+    """
+    Cache compartida entre workers (procesos) sobre un archivo mmap en /dev/shm con
+    slots de tamaño fijo: slot = hash(clave) % slots, sin índice ni punteros que
+    sincronizar. Una colisión simplemente pisa el slot (es una cache).
+
+    - Lectura sin locks: seqlock (seq impar = escritura en curso) + crc32 del payload;
+      si cambia a mitad de lectura se reintenta y, si no, cuenta como miss.
+    - Escritura: lock de rango (fcntl) sobre el slot entre procesos + lock entre hilos.
+    - Expiración en tiempo de pared (time.time): los workers no comparten reloj monotónico.
+
+    Misma interfaz que TTLCache (get/peek/set/invalidate/clear/stats); los valores
+    se guardan como JSON (encode/decode convierten modelos <-> dict).
+    """
+
+    def __init__(self, path: str, slots: int, slot_size: int, ttl_seconds: float,
+                 encode: Optional[Callable[[Any], Any]] = None,
+                 decode: Optional[Callable[[Any], Any]] = None):
+        self.path = path
+        self.slots = max(1, int(slots))
+        self.slot_size = int(slot_size)
+        self.ttl_seconds = float(ttl_seconds)
+        self._encode = encode or (lambda v: v)
+        self._decode = decode or (lambda v: v)
+        size = self.slots * self.slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversize = 0
+
+    def _locate(self, key: Hashable) -> tuple[bytes, int]:
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        return digest, (int.from_bytes(digest[:8], "little") % self.slots) * self.slot_size
+
+    @contextmanager
+    def _slot_lock(self, off: int) -> Iterator[None]:
+        with self._lock:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, off)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, off)
+
+    def _read(self, key: Hashable) -> Optional[Any]:
+        digest, off = self._locate(key)
+        mm = self._mm
+        for _ in range(3):
+            seq, kd, expires_at, length, crc = _HEADER.unpack_from(mm, off)
+            if seq & 1:
+                continue  # escritura en curso en otro worker
+            if kd != digest or not length or expires_at <= time.time():
+                return None
+            if length > self.slot_size - HEADER_SIZE:
+                return None
+            payload = mm[off + HEADER_SIZE: off + HEADER_SIZE + length]
+            if _SEQ.unpack_from(mm, off)[0] != seq or zlib.crc32(payload) != crc:
+                continue  # reescrito mientras leíamos
+            try:
+                return self._decode(json.loads(payload))
+            except ValueError:
+                return None
+        return None
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Como get() pero sin tocar contadores."""
+        return self._read(key)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl is None else min(float(ttl), self.ttl_seconds)
+        if ttl <= 0:
+            return
+        payload = json.dumps(self._encode(value), separators=(",", ":"), default=str).encode()
+        if len(payload) > self.slot_size - HEADER_SIZE:
+            # no cabe en un slot: no se cachea, y la versión anterior de la clave tampoco
+            # puede seguir sirviéndose en los demás workers (como en TTLCache, set reemplaza)
+            self.oversize += 1
+            self.invalidate(key)
+            return
+        digest, off = self._locate(key)
+        mm = self._mm
+        with self._slot_lock(off):
+            seq, kd, expires_at, length, _ = _HEADER.unpack_from(mm, off)
+            now = time.time()
+            if length and kd != digest and expires_at > now:
+                self.evictions += 1
+            _SEQ.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF)  # impar: lectores reintentan
+            mm[off + HEADER_SIZE: off + HEADER_SIZE + len(payload)] = payload
+            _HEADER.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF, digest, now + ttl, len(payload),
+                              zlib.crc32(payload))
+            _SEQ.pack_into(mm, off, (seq + 2) & 0xFFFFFFFF)
+
+    def invalidate(self, key: Hashable) -> None:
+        digest, off = self._locate(key)
+        mm = self._mm
+        with self._slot_lock(off):
+            seq, kd, _, _, _ = _HEADER.unpack_from(mm, off)
+            if kd != digest:
+                return
+            _HEADER.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF, bytes(16), 0.0, 0, 0)
+            _SEQ.pack_into(mm, off, (seq + 2) & 0xFFFFFFFF)
+
+    def clear(self) -> None:
+        for i in range(self.slots):
+            off = i * self.slot_size
+            with self._slot_lock(off):
+                seq = _SEQ.unpack_from(self._mm, off)[0]
+                _HEADER.pack_into(self._mm, off, (seq + 1) & 0xFFFFFFFF, bytes(16), 0.0, 0, 0)
+                _SEQ.pack_into(self._mm, off, (seq + 2) & 0xFFFFFFFF)
+
+    def __len__(self) -> int:
+        now = time.time()
+        return sum(
+            1 for i in range(self.slots)
+            if (h := _HEADER.unpack_from(self._mm, i * self.slot_size))[3] and h[2] > now
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        # hits/misses son de este worker; size es del segmento compartido
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.slots,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "oversize": self.oversize,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "shared": self.path,
+        }
+
+
+def shared_cache_path(name: str) -> str:
+    return os.path.join(settings.shared_cache_dir, f"auth-{name}.cache")
+
+
+def make_cache(name: str, max_size: int, ttl_seconds: float,
+               encode: Optional[Callable[[Any], Any]] = None,
+               decode: Optional[Callable[[Any], Any]] = None):
+    """
+    TTLCache en proceso o, con SHARED_CACHE=true (modo multi-worker), un segmento
+    compartido: lo que un worker lee es hit en todos.
+    """
+    if not settings.shared_cache_enabled:
+        return TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+    return SharedSlotCache(
+        shared_cache_path(name),
+        slots=settings.shared_cache_slots,
+        slot_size=settings.shared_cache_slot_size,
+        ttl_seconds=ttl_seconds,
+        encode=encode,
+        decode=decode,
+    )
@@ -0,0 +1,136 @@
+# app/singleflight.py
+import asyncio
+import secrets
+import time
+from typing import Awaitable, Callable, Dict, Optional, Protocol, TypeVar
+
+from app.config import settings
+from app.executor import run_blocking
+from app.firebase import get_firestore
+
+T = TypeVar("T")
+
+
+class LockStore(Protocol):
+    """Lock con lease compartido entre workers/réplicas."""
+
+    async def acquire(self, key: str, lease_seconds: int) -> Optional[str]:
+        """Devuelve un token si se obtuvo el lock; None si lo tiene otro."""
+        ...
+
+    async def release(self, key: str, token: str) -> None: ...
+
+
+class FirestoreLockStore:
+    """
+    Un doc por lock en FIRESTORE_LOCKS_COLLECTION: {owner, expires_at}.
+    Se toma con una transacción (crear o pisar un lease vencido).
+    """
+
+    def _ref(self, key: str):
+        return get_firestore().collection(settings.firestore_locks_collection).document(key)
+
+    def _acquire(self, key: str, lease_seconds: int) -> Optional[str]:
+        from app.repos.firestore_users import run_transaction
+
+        ref, token = self._ref(key), secrets.token_hex(8)
+
+        def _take(transaction) -> Optional[str]:
+            snap = ref.get(transaction=transaction)
+            now = time.time()
+            if snap.exists and (snap.to_dict() or {}).get("expires_at", 0) > now:
+                return None
+            transaction.set(ref, {"owner": token, "expires_at": now + lease_seconds})
+            return token
+
+        return run_transaction(_take)
+
+    def _release(self, key: str, token: str) -> None:
+        from app.repos.firestore_users import run_transaction
+
+        ref = self._ref(key)
+
+        def _drop(transaction) -> None:
+            snap = ref.get(transaction=transaction)
+            if snap.exists and (snap.to_dict() or {}).get("owner") == token:
+                transaction.delete(ref)
+
+        run_transaction(_drop)
+
+    async def acquire(self, key: str, lease_seconds: int) -> Optional[str]:
+        return await run_blocking("firestore", self._acquire, key, lease_seconds)
+
+    async def release(self, key: str, token: str) -> None:
+        await run_blocking("firestore", self._release, key, token)
+
+
+class SingleFlight:
+    """
+    De-duplica ejecuciones concurrentes por clave: la primera corre `fn`, las demás
+    (en este proceso) esperan su resultado. Con un LockStore compartido, los demás
+    workers esperan a que el lease se libere antes de correr su propia versión,
+    que para entonces encuentra el trabajo ya hecho (huellas sin cambios).
+    """
+
+    def __init__(self, lock_store: Optional[LockStore] = None, lease_seconds: int = 15,
+                 poll_seconds: float = 0.05):
+        self.lock_store = lock_store
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def _with_shared_lock(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        deadline = time.monotonic() + self.lease_seconds
+        token = await self.lock_store.acquire(key, self.lease_seconds)
+        while token is None and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_seconds)
+            token = await self.lock_store.acquire(key, self.lease_seconds)
+        try:
+            return await fn()
+        finally:
+            if token is not None:
+                await self.lock_store.release(key, token)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.followers += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if fut.cancelled():
+                    # se canceló el líder (p.ej. cliente desconectado), no nosotros: reintentar
+                    return await self.do(key, fn)
+                raise
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        self.leaders += 1
+        try:
+            if self.lock_store is not None:
+                result = await self._with_shared_lock(key, fn)
+            else:
+                result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # marcado como recuperado si no hay seguidores
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
+
+
+login_flight = SingleFlight(
+    lock_store=FirestoreLockStore() if settings.login_lock_store == "firestore" else None,
+    lease_seconds=settings.login_lock_lease_seconds,
+)
@@ -0,0 +1,128 @@
+# bench/bench_admission.py
+"""
+Tormenta de logins (/auth/google/callback) con y sin control de admisión, contra
+Firebase Auth y Firestore simulados con latencia (los pools de app/executor.py hacen
+de cuota del backend). Reporta logins servidos/rechazados, p50/p99 de los servidos,
+y p99 de /auth/me durante la tormenta (no debe verse afectado).
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_admission --logins 1000 --concurrency 300 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+os.environ.setdefault("ADMISSION_CLIENT_HEADER", "x-forwarded-for")
+
+from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore  # noqa: E402
+
+
+def _pct(samples, p):
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * p))]
+
+
+async def _probe(client, path, headers, stop, out):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get(path, headers=headers)
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def storm(client, args, admission_enabled: bool, token: str) -> dict:
+    from app import admission
+    from app.config import settings
+
+    settings.admission_enabled = admission_enabled
+    admission.login_admission = admission.AdmissionController.from_settings()
+
+    stop = asyncio.Event()
+    me = []
+    probe = asyncio.create_task(_probe(client, "/auth/me", {"Authorization": f"Bearer {token}"}, stop, me))
+    sem = asyncio.Semaphore(args.concurrency)
+    served, shed, retry_after = [], 0, set()
+
+    async def login(i):
+        nonlocal shed
+        async with sem:
+            headers = {"X-Forwarded-For": f"10.0.{i % args.clients // 256}.{i % args.clients % 256}"}
+            t0 = time.perf_counter()
+            r = await client.get("/auth/google/callback", headers=headers)
+            if r.status_code == 200:
+                served.append((time.perf_counter() - t0) * 1000)
+            elif r.status_code == 503:
+                shed += 1
+                retry_after.add(r.headers.get("retry-after"))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(args.logins)))
+    wall_s = time.perf_counter() - t0
+    stop.set()
+    await probe
+    return {
+        "admission": admission_enabled,
+        "logins": args.logins,
+        "served": len(served),
+        "shed_503": shed,
+        "retry_after": sorted(r for r in retry_after if r),
+        "wall_s": round(wall_s, 2),
+        "served_p50_ms": round(statistics.median(served or [0]), 1),
+        "served_p99_ms": round(_pct(served, 0.99), 1),
+        "me_p99_ms": round(_pct(me, 0.99), 2),
+        "controller": admission.login_admission.stats() if admission_enabled else None,
+    }
+
+
+async def main_async(args) -> None:
+    install_fake_firestore(FakeFirestore(latency_ms=args.latency_ms))
+    install_fake_auth(FakeFirebaseAuth(latency_ms=args.latency_ms))
+
+    from app import metrics
+    from app.main import app
+    from app.routers import auth as auth_router
+
+    counter = iter(range(10**9))
+
+    async def fake_authorize_access_token(request, **kwargs):
+        await asyncio.sleep(args.google_ms / 1000)  # intercambio del code en Google
+        sub = f"g{next(counter) % args.users}"
+        return {"access_token": f"at-{sub}", "id_token": "stub",
+                "userinfo": {"sub": sub, "email": f"{sub}@example.com", "name": f"User {sub}",
+                             "given_name": "User", "family_name": sub, "email_verified": True}}
+
+    auth_router.google_client().authorize_access_token = fake_authorize_access_token
+
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag(0.05))
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits,
+                                 timeout=60.0) as client:
+        from app.config import settings
+        settings.admission_enabled = False
+        r = await client.get("/auth/google/callback")
+        token = r.json()["token"]["access_token"]
+        for enabled in (False, True):
+            print(await storm(client, args, enabled, token))
+    lag_monitor.cancel()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=300, help="callbacks simultáneos en la tormenta")
+    ap.add_argument("--clients", type=int, default=500, help="IPs distintas (X-Forwarded-For)")
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="RTT simulado de Firestore/Firebase Auth")
+    ap.add_argument("--google-ms", type=float, default=50.0, help="latencia simulada del token exchange")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/bench_event_loop.py
+"""
+Mide la latencia de /health y /auth/me mientras corre una ráfaga de logins
+(/auth/google/callback) contra Firebase Auth y Firestore simulados con latencia.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_event_loop --logins 200 --latency-ms 20
+    python -m bench.bench_event_loop --inline   # comportamiento anterior (SDK en el event loop)
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore
+
+
+def _pct(samples, p):
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * p))]
+
+
+async def _probe(client, path, headers, stop, out):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get(path, headers=headers)
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def main_async(args) -> None:
+    install_fake_firestore(FakeFirestore(latency_ms=args.latency_ms))
+    install_fake_auth(FakeFirebaseAuth(latency_ms=args.latency_ms))
+
+    from app.main import app
+    from app.routers import auth as auth_router
+    from app.security import create_access_token
+
+    counter = iter(range(10**9))
+
+    async def fake_authorize_access_token(request, **kwargs):
+        # Como Authlib: el id_token ya validado deja los claims en token["userinfo"]
+        sub = f"g{next(counter)}"
+        return {"access_token": f"at-{sub}", "id_token": "stub",
+                "userinfo": {"sub": sub, "email": f"{sub}@example.com", "name": f"User {sub}",
+                             "given_name": "User", "family_name": sub, "email_verified": True}}
+
+    auth_router.google_client().authorize_access_token = fake_authorize_access_token
+
+    if args.inline:
+        async def inline(backend, fn, *a, **kw):
+            return fn(*a, **kw)
+        auth_router.run_blocking = inline
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # usuario para /auth/me
+        r = await client.get("/auth/google/callback")
+        token = r.json()["token"]["access_token"] if r.status_code == 200 else create_access_token({"sub": "g0"})
+        auth = {"Authorization": f"Bearer {token}"}
+
+        stop = asyncio.Event()
+        health, me = [], []
+        probes = [
+            asyncio.create_task(_probe(client, "/health", {}, stop, health)),
+            asyncio.create_task(_probe(client, "/auth/me", auth, stop, me)),
+        ]
+        await asyncio.sleep(0.2)
+        idle_health = list(health)
+
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def login():
+            async with sem:
+                await client.get("/auth/google/callback")
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        burst_s = time.perf_counter() - t0
+        stop.set()
+        await asyncio.gather(*probes)
+
+    burst_health = health[len(idle_health):]
+    print({
+        "mode": "inline" if args.inline else "executor",
+        "logins": args.logins,
+        "burst_s": round(burst_s, 3),
+        "health_idle_p50_ms": round(statistics.median(idle_health or [0]), 2),
+        "health_burst_p50_ms": round(statistics.median(burst_health or [0]), 2),
+        "health_burst_p99_ms": round(_pct(burst_health, 0.99), 2),
+        "me_p99_ms": round(_pct(me, 0.99), 2),
+    })
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--inline", action="store_true")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
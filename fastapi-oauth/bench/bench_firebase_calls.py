@@ -0,0 +1,38 @@
+# bench/bench_firebase_calls.py
+"""
+RPCs a Firebase Auth por login recurrente (antes: get_user + update_user siempre).
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_firebase_calls --users 100 --rounds 5
+"""
+import argparse
+
+from bench.fakes import FakeFirebaseAuth, install_fake_auth
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--no-fp-cache", action="store_true", help="desactiva la huella en cache (solo diff)")
+    args = ap.parse_args()
+
+    fa = install_fake_auth(FakeFirebaseAuth())
+    from app.services import firebase_users
+
+    def userinfo(i, rnd):
+        # 1 de cada 10 usuarios cambia de nombre en cada ronda
+        name = f"User {i} r{rnd}" if i % 10 == 0 else f"User {i}"
+        return {"sub": f"g{i}", "email": f"g{i}@example.com", "name": name, "email_verified": True}
+
+    for rnd in range(args.rounds):
+        for i in range(args.users):
+            if args.no_fp_cache:
+                firebase_users.profile_fp_cache.clear()
+            firebase_users.ensure_firebase_user(f"g{i}", userinfo(i, rnd))
+
+    print({"fake_calls": dict(fa.calls), "counters": firebase_users.stats()})
+
+
+if __name__ == "__main__":
+    main()
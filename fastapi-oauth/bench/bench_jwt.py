@@ -0,0 +1,61 @@
+# bench/bench_jwt.py
+"""
+Micro-benchmark de firma/verificación de JWT por algoritmo (HS256, RS256, ES256),
+con llaves precargadas (KeyRing) frente a re-parsear el material en cada llamada.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_jwt --n 2000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwt
+
+from app.keys import KeyRing
+
+
+def _pem(alg: str) -> str:
+    key = rsa.generate_private_key(65537, 2048) if alg == "RS256" else ec.generate_private_key(ec.SECP256R1())
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode()
+
+
+def _rate(n: int, fn) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round(n / (time.perf_counter() - t0), 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+    claims = {"sub": "u1", "email": "u1@example.com", "roles": ["EMPLOYEE"],
+              "exp": datetime.utcnow() + timedelta(minutes=5)}
+
+    for alg in ("HS256", "RS256", "ES256"):
+        ring = KeyRing()
+        if alg == "HS256":
+            material = "bench-secret"
+            ring.add_secret("k1", material)
+        else:
+            material = _pem(alg)
+            ring.add_pem("k1", material)
+        ring.active_kid = "k1"
+        token = ring.sign(claims)
+        verify_material = material if alg == "HS256" else ring.keys["k1"].public_jwk
+
+        print({
+            "alg": alg,
+            "sign_per_s": _rate(args.n, lambda: ring.sign(claims)),
+            "verify_per_s": _rate(args.n, lambda: ring.decode(token)),
+            "verify_reparse_per_s": _rate(args.n, lambda: jwt.decode(token, verify_material, algorithms=[alg])),
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# bench/bench_login_writes.py
+"""
+Escrituras a Firestore por login recurrente con y sin write-behind de last_login.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_login_writes --users 200 --rounds 10
+"""
+import argparse
+import time
+
+from bench.fakes import FakeFirestore, install_fake_firestore
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--latency-ms", type=float, default=2.0)
+    args = ap.parse_args()
+
+    fs = install_fake_firestore(FakeFirestore(latency_ms=args.latency_ms))
+    from app.repos import users_repo
+
+    def profile(i):
+        return {"sub": f"g{i}", "email": f"g{i}@example.com", "name": f"User {i}",
+                "given_name": "User", "family_name": str(i)}
+
+    for i in range(args.users):
+        users_repo.create_or_update_from_google(profile(i), f"g{i}")
+    users_repo.flush_login_touches()
+
+    fs.reset_calls()
+    t0 = time.perf_counter()
+    for _ in range(args.rounds):
+        for i in range(args.users):
+            users_repo.create_or_update_from_google(profile(i), f"g{i}")
+    login_s = time.perf_counter() - t0
+    calls_before_flush = dict(fs.calls)
+    flushed = users_repo.flush_login_touches()
+
+    logins = args.users * args.rounds
+    print({
+        "logins": logins,
+        "login_ms_avg": round(login_s / logins * 1000, 3),
+        "sync_calls": calls_before_flush,
+        "flushed_touches": flushed,
+        "calls_after_flush": dict(fs.calls),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench/bench_me_etag.py
+"""
+Polling de /auth/me con y sin If-None-Match (principal cacheado):
+bytes de respuesta, latencia y lecturas de Firestore por poll.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_me_etag --n 5000 --latency-ms 2
+"""
+import argparse
+import asyncio
+import time
+
+
+async def run(n: int, latency_ms: float) -> None:
+    import httpx
+
+    from bench.fakes import FakeFirestore, install_fake_firestore
+    fs = install_fake_firestore(FakeFirestore(latency_ms=latency_ms))
+
+    from app.config import settings
+    from app.main import app
+    from app.repos import users_repo
+    from app.security import create_access_token
+
+    fs.collection(settings.firestore_users_collection).document("u1").set(
+        {"uid": "u1", "email": "u1@example.com", "username": "u1", "roles": ["EMPLOYEE"],
+         "active": True, "updated_at": 1})
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'u1'})}"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        first = await client.get("/auth/me", headers=headers)
+        etag = first.headers["etag"]
+        for conditional in (False, True):
+            h = {**headers, "If-None-Match": etag} if conditional else headers
+            users_repo.user_doc_cache.clear()  # peor caso: el doc ya expiró de la cache local
+            fs.reset_calls()
+            size, t0 = 0, time.perf_counter()
+            for _ in range(n):
+                resp = await client.get("/auth/me", headers=h)
+                size += len(resp.content)
+            elapsed = time.perf_counter() - t0
+            print({
+                "if_none_match": conditional,
+                "status": resp.status_code,
+                "req_per_s": round(n / elapsed, 1),
+                "bytes_per_poll": round(size / n, 1),
+                "firestore_reads_per_poll": round(fs.calls["reads"] / n, 3),
+            })
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    asyncio.run(run(args.n, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
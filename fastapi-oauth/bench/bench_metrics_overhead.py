@@ -0,0 +1,74 @@
+# bench/bench_metrics_overhead.py
+"""
+Overhead de la instrumentación Prometheus en el camino caliente de /auth/me
+(principal cacheado). Ejecuta el mismo bucle con METRICS_ENABLED=true/false
+en subprocesos separados (la configuración se lee al importar app.main).
+Con --profiling añade una corrida con el profiler de requests activo (app/profiling.py).
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_metrics_overhead --n 5000
+    python -m bench.bench_metrics_overhead --profiling --sample-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+async def _worker(n: int) -> dict:
+    import httpx
+
+    from bench.fakes import install_fake_firestore
+    fs = install_fake_firestore()
+
+    from app.config import settings
+    from app.main import app
+    from app.security import create_access_token
+
+    fs.collection(settings.firestore_users_collection).document("u1").set(
+        {"uid": "u1", "email": "u1@example.com", "username": "u1", "roles": ["EMPLOYEE"], "active": True})
+    token = create_access_token({"sub": "u1"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(200):  # warm-up (y llena la cache de principales)
+            await client.get("/auth/me", headers=headers)
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            await client.get("/auth/me", headers=headers)
+            samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "metrics_enabled": settings.metrics_enabled,
+        "profiling_enabled": settings.profiling_enabled,
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+        "req_per_s": round(n / sum(samples), 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--profiling", action="store_true", help="añade una corrida con PROFILING_ENABLED=true")
+    ap.add_argument("--sample-rate", type=float, default=0.01)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        print(json.dumps(asyncio.run(_worker(args.n))))
+        return
+    runs = [("false", "false"), ("true", "false")] + ([("true", "true")] if args.profiling else [])
+    for enabled, profiling in runs:
+        env = {**os.environ, "METRICS_ENABLED": enabled, "PROFILING_ENABLED": profiling,
+               "PROFILING_SAMPLE_RATE": str(args.sample_rate)}
+        out = subprocess.run([sys.executable, "-m", "bench.bench_metrics_overhead", "--worker", "--n", str(args.n)],
+                             env=env, capture_output=True, text=True, check=True)
+        print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
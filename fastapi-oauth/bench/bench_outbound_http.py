@@ -0,0 +1,157 @@
+# bench/bench_outbound_http.py
+"""
+Latencia de las llamadas salientes de un login (POST token + GET userinfo)
+contra el StubOIDCProvider servido por uvicorn con TLS local (CA autofirmada):
+
+  per_call -> un httpx.AsyncClient nuevo por llamada (Authlib sin transporte inyectado)
+  shared   -> clientes por llamada sobre app.http_client.SharedTransport (pool compartido)
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_outbound_http --logins 300
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _write_tls_material(dirpath: Path) -> Tuple[str, str, str]:
+    """CA autofirmada + certificado de servidor para 127.0.0.1. Devuelve (ca, cert, key)."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    ca_key = ec.generate_private_key(ec.SECP256R1())
+    ca_name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench-ca")])
+    ca_cert = (
+        x509.CertificateBuilder()
+        .subject_name(ca_name).issuer_name(ca_name)
+        .public_key(ca_key.public_key()).serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5)).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(ca_key, hashes.SHA256())
+    )
+    key = ec.generate_private_key(ec.SECP256R1())
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")]))
+        .issuer_name(ca_name)
+        .public_key(key.public_key()).serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5)).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+                       critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+    pem = serialization.Encoding.PEM
+    paths = (dirpath / "ca.pem", dirpath / "server.pem", dirpath / "server.key")
+    paths[0].write_bytes(ca_cert.public_bytes(pem))
+    paths[1].write_bytes(cert.public_bytes(pem))
+    paths[2].write_bytes(key.private_bytes(pem, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return tuple(str(p) for p in paths)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _TLSStubServer:
+    """uvicorn en un hilo aparte sirviendo el stub OIDC por https://127.0.0.1:<port>."""
+
+    def __init__(self, certfile: str, keyfile: str):
+        import uvicorn
+
+        from bench.stub_oidc import StubOIDCProvider
+
+        self.port = _free_port()
+        self.stub = StubOIDCProvider(issuer=f"https://127.0.0.1:{self.port}")
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.stub.app, host="127.0.0.1", port=self.port, ssl_certfile=certfile,
+            ssl_keyfile=keyfile, log_level="warning", lifespan="off",
+        ))
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "_TLSStubServer":
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+async def _login_calls(make_client, stub, sub: str) -> float:
+    """Lo que hace el callback: POST al token endpoint y GET a userinfo, cada uno con su cliente."""
+    t0 = time.perf_counter()
+    async with make_client() as client:
+        resp = await client.post(f"{stub.issuer}/token",
+                                 data={"grant_type": "authorization_code", "code": stub.issue_code(sub)})
+        resp.raise_for_status()
+        access = resp.json()["access_token"]
+    async with make_client() as client:
+        resp = await client.get(f"{stub.issuer}/userinfo", headers={"Authorization": f"Bearer {access}"})
+        resp.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def _run_variant(name: str, stub, ca: str, logins: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+
+    from app.http_client import SharedTransport
+
+    shared: Optional[SharedTransport] = None
+    if name == "shared":
+        shared = SharedTransport(httpx.AsyncHTTPTransport(verify=ca, limits=httpx.Limits(max_keepalive_connections=20)))
+        make_client = lambda: httpx.AsyncClient(transport=shared)  # noqa: E731
+    else:
+        make_client = lambda: httpx.AsyncClient(verify=ca)  # noqa: E731
+
+    samples: List[float] = []
+    pending = iter(range(logins))
+
+    async def worker() -> None:
+        for i in pending:
+            samples.append(await _login_calls(make_client, stub, f"u{i % 50}"))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    samples.sort()
+    out = {
+        "variant": name,
+        "logins_per_s": round(logins / elapsed, 1),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 2),
+    }
+    if shared is not None:
+        out["transport"] = shared.stats()
+        await shared.close()
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        ca, cert, key = _write_tls_material(Path(tmp))
+        with _TLSStubServer(cert, key) as server:
+            for variant in ("per_call", "shared"):
+                print(asyncio.run(_run_variant(variant, server.stub, ca, args.logins, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# bench/bench_revocation.py
+"""
+Coste del chequeo de revocación en el camino caliente (principal cacheado) con
+una deny-list grande, y propagación de un cambio de roles entre "workers"
+(dos RevocationList sincronizadas contra el mismo FakeFirestore).
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_revocation --entries 100000 --checks 1000000
+"""
+import argparse
+import time
+
+
+def run(entries: int, checks: int) -> None:
+    from bench.fakes import install_fake_firestore
+    fs = install_fake_firestore()
+
+    from app import revocation
+    from app.revocation import RevocationList, revoke_token, revoke_user_tokens, sync_revocations
+
+    for i in range(entries):
+        revocation.revocations.apply([{"kind": "jti", "key": f"j{i}", "expires_at": time.time() + 900,
+                                       "created_at": 0}])
+    rl = revocation.revocations
+    t0 = time.perf_counter()
+    for i in range(checks):
+        rl.is_revoked("u1", "not-revoked", 0)
+    per_check = (time.perf_counter() - t0) / checks
+    print({"entries": entries, "ns_per_check": round(per_check * 1e9, 1)})
+
+    # propagación: el "worker B" solo ve el evento tras sincronizar (sin lecturas de usuarios)
+    worker_b = RevocationList()
+    revocation.revocations = worker_b
+    sync_revocations()
+    revocation.revocations = rl
+    issued_ms = int(time.time() * 1000) - 1
+    revoke_user_tokens(["u1"])
+    revoke_token("jti-logout")
+    assert not worker_b.is_revoked("u1", None, issued_ms)
+    revocation.revocations = worker_b
+    fs.reset_calls()
+    synced = sync_revocations()
+    revocation.revocations = rl
+    print({"synced_events": synced, "firestore_calls": fs.calls,
+           "uid_revoked_on_b": worker_b.is_revoked("u1", None, issued_ms),
+           "jti_revoked_on_b": worker_b.is_revoked("u2", "jti-logout", issued_ms)})
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=100000)
+    ap.add_argument("--checks", type=int, default=1000000)
+    args = ap.parse_args()
+    run(args.entries, args.checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench/bench_roles_bulk.py
+"""
+Throughput de asignación de roles: POST /auth/roles/set (uno por request)
+frente a POST /auth/roles/bulk (NDJSON, WriteBatch por chunks), contra FakeFirestore.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_roles_bulk --users 2000 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from bench.fakes import FakeFirestore, install_fake_firestore
+
+
+async def main_async(args) -> None:
+    fs = install_fake_firestore(FakeFirestore(latency_ms=args.latency_ms))
+
+    from app.config import settings
+    from app.deps import current_user
+    from app.main import app
+    from app.schemas import AuthUser
+
+    col = fs.collection(settings.firestore_users_collection)
+    for i in range(args.users):
+        col.document(f"u{i}").set({"uid": f"u{i}", "email": f"u{i}@example.com", "username": f"u{i}",
+                                   "roles": ["EMPLOYEE"], "updated_at": 1})
+    app.dependency_overrides[current_user] = lambda: AuthUser(uid="admin", roles=["HR_ADMIN"])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(i):
+            async with sem:
+                r = await client.post("/auth/roles/set", json={"uid": f"u{i}", "roles": ["MANAGER"]})
+                r.raise_for_status()
+
+        fs.reset_calls()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+        single_s = time.perf_counter() - t0
+        single_calls = dict(fs.calls)
+
+        body = "".join(json.dumps({"email": f"u{i}@example.com", "roles": ["EMPLOYEE"]}) + "\n"
+                       for i in range(args.users))
+        fs.reset_calls()
+        t0 = time.perf_counter()
+        r = await client.post("/auth/roles/bulk", content=body,
+                              headers={"Content-Type": "application/x-ndjson"})
+        lines = [json.loads(l) for l in r.text.splitlines() if l]
+        bulk_s = time.perf_counter() - t0
+        assert len(lines) == args.users and all(l["ok"] for l in lines), lines[:3]
+
+    print({
+        "users": args.users,
+        "single_items_per_s": round(args.users / single_s, 1),
+        "single_firestore_calls": single_calls,
+        "bulk_items_per_s": round(args.users / bulk_s, 1),
+        "bulk_firestore_calls": dict(fs.calls),
+    })
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
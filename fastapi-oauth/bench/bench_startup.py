@@ -0,0 +1,186 @@
+# bench/bench_startup.py
+"""
+Arranque en frío del servicio:
+  - import de app.main con `python -X importtime` (tiempo acumulado por módulo)
+  - time-to-first-request: proceso uvicorn nuevo -> primer 200 de /health
+  - time-to-ready: proceso uvicorn nuevo -> primer 200 de /ready (warm-up terminado)
+
+El servidor es bench/fake_app.py (Firestore/Firebase Auth en memoria), así no hacen
+falta credenciales. Además comprueba que los SDKs pesados no vuelvan a colarse en el
+import de app.main (deben cargarse en el warm-up del lifespan o al primer uso).
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_startup --runs 5
+    python -m bench.bench_startup --save-baseline            # actualiza bench/startup_baseline.json
+    python -m bench.bench_startup --compare --tolerance 0.25 # exit 1 si hay regresión
+
+bench/startup_baseline.json trae una referencia (comando, plataforma y nº de CPUs).
+Las cifras dependen de la máquina: en otro entorno, regraba con --save-baseline antes
+de comparar. --compare sin baseline termina con exit 1.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASELINE_PATH = Path(__file__).with_name("startup_baseline.json")
+ROOT = Path(__file__).resolve().parent.parent
+
+# No deben importarse al cargar app.main (solo en el warm-up o al primer uso)
+LAZY_MODULES = ("firebase_admin", "google.cloud.firestore", "grpc", "authlib", "sqlalchemy", "passlib")
+
+# "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _env() -> Dict[str, str]:
+    env = {**os.environ, "OIDC_PREFETCH": "false", "METRICS_ENABLED": "false", "BENCH_USERS": "1"}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return env
+
+
+def import_profile() -> Tuple[float, Dict[str, float]]:
+    """(ms totales de `import app.main`, ms acumulados por módulo de primer nivel)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    modules: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        name, cumulative_ms = m.group(4), int(m.group(2)) / 1000
+        modules[name] = max(modules.get(name, 0.0), cumulative_ms)
+    return modules.get("app.main", 0.0), modules
+
+
+def loaded_lazy_modules(modules: Dict[str, float]) -> List[str]:
+    return sorted(lazy for lazy in LAZY_MODULES
+                  if any(name == lazy or name.startswith(lazy + ".") for name in modules))
+
+
+def _wait_for(server: subprocess.Popen, base_url: str, path: str, started: float,
+              timeout: float) -> Optional[float]:
+    import httpx
+
+    while time.perf_counter() - started < timeout and server.poll() is None:  # caído: no esperar más
+        try:
+            if httpx.get(f"{base_url}{path}", timeout=0.5).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def serve_once(timeout: float) -> Dict[str, Optional[float]]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench.fake_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_request_ms = _wait_for(server, base_url, "/health", started, timeout)
+        ready_ms = _wait_for(server, base_url, "/ready", started, timeout)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"first_request_ms": first_request_ms, "ready_ms": ready_ms}
+
+
+def run(args) -> Dict[str, Any]:
+    imports, runs = [], []
+    modules: Dict[str, float] = {}
+    for _ in range(args.runs):
+        total, modules = import_profile()
+        imports.append(total)
+        runs.append(serve_once(args.timeout))
+    failed = [r for r in runs if r["first_request_ms"] is None or r["ready_ms"] is None]
+    if failed:
+        raise RuntimeError(f"server did not become ready in {args.timeout}s ({len(failed)}/{len(runs)} runs)")
+    top = sorted(((n, ms) for n, ms in modules.items() if "." not in n and n != "app"),
+                 key=lambda x: -x[1])[: args.top]
+    return {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(imports), 1),
+        "first_request_ms": round(statistics.median(r["first_request_ms"] for r in runs), 1),
+        "ready_ms": round(statistics.median(r["ready_ms"] for r in runs), 1),
+        "top_imports_ms": {n: round(ms, 1) for n, ms in top},
+        "lazy_modules_loaded": loaded_lazy_modules(modules),
+    }
+
+
+# ── Baseline ─────────────────────────────────────────────────────────────────
+_METRICS = ("import_ms", "first_request_ms", "ready_ms")
+
+
+def load_baseline() -> Dict[str, Any]:
+    if not BASELINE_PATH.is_file():
+        return {}
+    return json.loads(BASELINE_PATH.read_text() or "{}")
+
+
+def save_baseline(result: Dict[str, Any]) -> None:
+    meta = {"recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "command": "python -m " + __spec__.name + " " + " ".join(sys.argv[1:])}
+    data = {**{m: result[m] for m in _METRICS}, **meta}
+    BASELINE_PATH.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def compare(result: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Regresión = un SDK pesado importado por app.main, o un tiempo más de `tolerance` por
+    encima. Sin baseline (o sin alguna métrica) también falla: el gate no puede pasar en vacío.
+    """
+    problems = [f"{name} imported by app.main (should load lazily)" for name in result["lazy_modules_loaded"]]
+    base = load_baseline()
+    for metric in _METRICS:
+        if not base.get(metric):
+            problems.append(f"{metric}: no baseline in {BASELINE_PATH.name} (run --save-baseline)")
+        elif result[metric] > base[metric] * (1 + tolerance):
+            problems.append(f"{metric}: {base[metric]} -> {result[metric]}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5, help="arranques en frío (se reporta la mediana)")
+    ap.add_argument("--top", type=int, default=15, help="paquetes de primer nivel más lentos a mostrar")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--compare", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.save_baseline:
+        save_baseline(result)
+        print(f"baseline saved to {BASELINE_PATH}")
+    if args.compare:
+        problems = compare(result, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench/bench_users_backends.py
+"""
+Compara los backends de usuarios (Firestore en memoria vs SQLAlchemy sobre SQLite)
+a través de la misma API de users_repo, con la cache desactivada.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_users_backends --users 500 --reads 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench.fakes import FakeFirestore, install_fake_firestore
+
+
+def _rate(n: int, t0: float) -> float:
+    return round(n / (time.perf_counter() - t0), 1)
+
+
+def run(backend: str, users: int, reads: int, latency_ms: float) -> dict:
+    from app.config import settings
+    from app.repos import users_repo
+
+    settings.users_backend = backend
+    settings.user_cache_enabled = False
+    users_repo._backend_impl = None
+    if backend == "sql":
+        from app import database
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        settings.database_url = f"sqlite:///{path}"
+        database._engine = None
+        database.init_db()
+    else:
+        install_fake_firestore(FakeFirestore(latency_ms=latency_ms))
+
+    def profile(i):
+        return {"sub": f"g{i}", "email": f"g{i}@example.com", "name": f"User {i}",
+                "given_name": "User", "family_name": str(i)}
+
+    t0 = time.perf_counter()
+    for i in range(users):
+        users_repo.create_or_update_from_google(profile(i), f"g{i}")
+    first = _rate(users, t0)
+
+    t0 = time.perf_counter()
+    for i in range(users):
+        users_repo.create_or_update_from_google(profile(i), f"g{i}")
+    returning = _rate(users, t0)
+
+    rnd = random.Random(7)
+    t0 = time.perf_counter()
+    for _ in range(reads):
+        assert users_repo.get_user_doc(f"g{rnd.randrange(users)}")
+    read = _rate(reads, t0)
+
+    admins = [u for u in (users_repo.get_user_doc(f"g{i}") for i in range(users)) if "HR_ADMIN" in u["roles"]]
+    assert len(admins) == 1, admins
+    return {"backend": backend, "first_login_per_s": first, "returning_login_per_s": returning,
+            "get_user_doc_per_s": read}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--reads", type=int, default=5000)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latencia simulada del fake de Firestore")
+    args = ap.parse_args()
+    for backend in ("firestore", "sql"):
+        print(run(backend, args.users, args.reads, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench/bench_users_cache.py
+"""
+Benchmark offline de la cache read-through de users_repo contra FakeFirestore.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_users_cache --users 200 --reads 20000 --latency-ms 2
+"""
+import argparse
+import random
+import time
+
+from bench.fakes import FakeFirestore, install_fake_firestore
+
+
+def run(users: int, reads: int, latency_ms: float, cached: bool) -> dict:
+    from app.config import settings
+    from app.repos import users_repo
+
+    fs = install_fake_firestore(FakeFirestore(latency_ms=latency_ms))
+    col = fs.collection(settings.firestore_users_collection)
+    started = int(time.time())
+    for i in range(users):
+        col.document(f"u{i}").set({"uid": f"u{i}", "email": f"u{i}@example.com",
+                                   "username": f"u{i}", "roles": ["EMPLOYEE"], "updated_at": started - 3600})
+    fs.reset_calls()
+
+    settings.user_cache_enabled = cached
+    users_repo.user_doc_cache.clear()
+    users_repo.start_users_listener()
+
+    rnd = random.Random(42)
+    t0 = time.perf_counter()
+    for n in range(reads):
+        uid = f"u{rnd.randrange(users)}"
+        users_repo.get_user_doc(uid)
+        if n % 1000 == 0:
+            # escritura "remota": debe propagarse por on_snapshot
+            col.document(uid).set({"roles": ["MANAGER"], "updated_at": started + n}, merge=True)
+            assert users_repo.get_user_doc(uid)["roles"] == ["MANAGER"]
+    elapsed = time.perf_counter() - t0
+    users_repo.stop_users_listener()
+    return {
+        "cached": cached,
+        "ops_per_s": round(reads / elapsed, 1),
+        "firestore_reads": fs.calls["reads"],
+        "cache": users_repo.user_doc_cache.stats(),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--reads", type=int, default=20000)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    for cached in (False, True):
+        print(run(args.users, args.reads, args.latency_ms, cached))
+
+
+if __name__ == "__main__":
+    main()
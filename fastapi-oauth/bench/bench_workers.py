@@ -0,0 +1,119 @@
+# bench/bench_workers.py
+"""
+Escalado de throughput de /auth/me de 1 a N workers (gunicorn + uvicorn, app precargada),
+con y sin la cache compartida entre workers (SHARED_CACHE). El servidor usa
+bench/fake_app.py (Firestore en memoria con latencia simulada); la carga la generan
+varios procesos cliente para que el generador no sea el cuello de botella.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.bench_workers --workers 1 2 4 --duration 10 --users 1000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _client_proc(args: tuple) -> List[float]:
+    base_url, tokens, duration, concurrency, seed = args
+
+    async def run() -> List[float]:
+        import httpx
+
+        rnd = random.Random(seed)
+        samples: List[float] = []
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            async def worker() -> None:
+                while time.perf_counter() < deadline:
+                    headers = {"Authorization": f"Bearer {rnd.choice(tokens)}"}
+                    t0 = time.perf_counter()
+                    resp = await client.get("/auth/me", headers=headers)
+                    if resp.status_code == 200:
+                        samples.append(time.perf_counter() - t0)
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples
+
+    return asyncio.run(run())
+
+
+def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run_once(workers: int, shared: bool, args, tokens: List[str]) -> Dict[str, object]:
+    port = _free_port()
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}",
+           "SHARED_CACHE": "true" if shared else "false", "BENCH_USERS": str(args.users),
+           "BENCH_LATENCY_MS": str(args.latency_ms), "OIDC_PREFETCH": "false", "METRICS_ENABLED": "false"}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "bench.fake_app:app"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url)
+        jobs = [(base_url, tokens, args.duration, args.concurrency, i) for i in range(args.clients)]
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            samples = sorted(s for part in pool.map(_client_proc, jobs) for s in part)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    n = len(samples)
+    return {
+        "workers": workers,
+        "shared_cache": shared,
+        "req_per_s": round(n / args.duration, 1),
+        "p50_ms": round(samples[n // 2] * 1000, 2) if n else None,
+        "p99_ms": round(samples[int(n * 0.99)] * 1000, 2) if n else None,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--clients", type=int, default=4, help="procesos generadores de carga")
+    ap.add_argument("--concurrency", type=int, default=32, help="conexiones por proceso cliente")
+    ap.add_argument("--latency-ms", type=float, default=2.0)
+    ap.add_argument("--no-baseline", action="store_true", help="omite las corridas sin cache compartida")
+    args = ap.parse_args()
+
+    from app.security import create_access_token
+    tokens = [create_access_token({"sub": f"u{i}"}) for i in range(args.users)]
+
+    base = None
+    for workers in args.workers:
+        for shared in ((True,) if args.no_baseline else (False, True)):
+            result = run_once(workers, shared, args, tokens)
+            if shared:
+                base = base or result["req_per_s"]
+                result["scaling"] = round(result["req_per_s"] / base, 2) if base else None
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench/check_oidc_cache.py
+"""
+Verificación offline de app/oidc.py contra el proveedor stub (sin red):
+prefetch, inyección en Authlib, refresco por Cache-Control y last known-good.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.check_oidc_cache
+"""
+import asyncio
+import time
+
+import httpx
+
+from app.oidc import OIDCMetadataCache
+from bench.stub_oidc import StubOIDCProvider
+
+
+class _FakeAuthlibApp:
+    def __init__(self):
+        self.server_metadata = {}
+
+
+async def main_async() -> None:
+    stub = StubOIDCProvider(max_age=1)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub.app), base_url=stub.issuer)
+    cache = OIDCMetadataCache(f"{stub.issuer}/.well-known/openid-configuration",
+                              min_refresh=1, max_refresh=60, retry_seconds=1)
+    oauth_app = _FakeAuthlibApp()
+
+    await cache.start(oauth_app, client=client)
+    assert cache.metadata["issuer"] == stub.issuer
+    assert oauth_app.server_metadata["jwks"]["keys"][0]["kid"] == "stub-1"
+    assert "_loaded_at" in oauth_app.server_metadata
+    assert stub.hits["discovery"] == 1 and stub.hits["jwks"] == 1
+
+    # rotación de claves: el refresco en segundo plano (max-age=1) la recoge
+    stub.rotate_key("stub-2")
+    await asyncio.sleep(2.5)
+    assert oauth_app.server_metadata["jwks"]["keys"][0]["kid"] == "stub-2", cache.stats()
+
+    # proveedor caído: se conserva la última copia buena
+    stub.fail = True
+    await asyncio.sleep(2.5)
+    assert cache.refresh_failures >= 1
+    assert oauth_app.server_metadata["jwks"]["keys"][0]["kid"] == "stub-2"
+
+    await cache.stop()
+    await client.aclose()
+    print({"ok": True, "stub_hits": dict(stub.hits), "cache": cache.stats()})
+
+
+def main() -> None:
+    t0 = time.perf_counter()
+    asyncio.run(main_async())
+    print(f"done in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
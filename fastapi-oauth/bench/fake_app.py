@@ -0,0 +1,27 @@
+# bench/fake_app.py
+"""
+app.main con Firestore y Firebase Auth en memoria, para levantar el servidor real
+(uvicorn/gunicorn) sin credenciales:
+
+    BENCH_USERS=1000 gunicorn -c gunicorn.conf.py bench.fake_app:app
+
+Con preload_app cada worker hereda una copia del fake ya sembrado.
+"""
+import os
+
+from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore
+
+fs = install_fake_firestore(FakeFirestore(latency_ms=float(os.getenv("BENCH_LATENCY_MS", "2"))))
+install_fake_auth(FakeFirebaseAuth(latency_ms=float(os.getenv("BENCH_LATENCY_MS", "2"))))
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402,F401
+
+_users = fs.collection(settings.firestore_users_collection)
+for i in range(int(os.getenv("BENCH_USERS", "1000"))):
+    _users.document(f"u{i}").set({
+        "uid": f"u{i}", "email": f"u{i}@example.com", "username": f"u{i}",
+        "roles": ["HR_ADMIN"] if i == 0 else ["EMPLOYEE"], "active": True, "updated_at": 1,
+    })
+fs.collection(settings.firestore_meta_collection).document("bootstrap").set({"admin_bootstrapped": True})
+fs.reset_calls()
@@ -0,0 +1,338 @@
+# bench/fakes.py
+"""
+Dobles en memoria de Firestore y Firebase Auth para benchmarks offline.
+Se inyectan vía app.firebase (firestore_client / fb_auth) sin tocar credenciales reales.
+"""
+import copy
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+
+_COMPARE = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+class FakeSnapshot:
+    def __init__(self, ref: "FakeDocumentRef", data: Optional[Dict[str, Any]]):
+        self.reference = ref
+        self.id = ref.id
+        self._data = copy.deepcopy(data) if data is not None else None
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeWatch:
+    def __init__(self, col: "FakeCollection", callback: Callable):
+        self._col = col
+        self._callback = callback
+
+    def unsubscribe(self) -> None:
+        if self._callback in self._col._listeners:
+            self._col._listeners.remove(self._callback)
+
+
+class FakeDocumentRef:
+    def __init__(self, col: "FakeCollection", doc_id: str):
+        self._col = col
+        self.id = doc_id
+
+    def get(self, *args, **kwargs) -> FakeSnapshot:
+        self._col._db._tick("reads")
+        return FakeSnapshot(self, self._col._docs.get(self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._col._db._tick("writes")
+        self._col._write(self.id, data, merge=merge)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        self._col._db._tick("writes")
+        if self.id not in self._col._docs:
+            raise KeyError(f"No document to update: {self.id}")
+        self._col._write(self.id, data, merge=True)
+
+    def delete(self) -> None:
+        self._col._db._tick("writes")
+        self._col._delete(self.id)
+
+
+class FakeQuery:
+    def __init__(self, col: "FakeCollection", filters=None, limit: Optional[int] = None,
+                 order: Optional[List[tuple]] = None, start_after: Any = None, fields: Optional[List[str]] = None):
+        self._col = col
+        self._filters = list(filters or [])
+        self._limit = limit
+        self._order = list(order or [])
+        self._start_after = start_after
+        self._fields = fields
+
+    def _with(self, **changes: Any) -> "FakeQuery":
+        state = {"filters": self._filters, "limit": self._limit, "order": self._order,
+                 "start_after": self._start_after, "fields": self._fields, **changes}
+        return FakeQuery(self._col, **state)
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        return self._with(filters=self._filters + [(field, op, value)])
+
+    def limit(self, n: int) -> "FakeQuery":
+        return self._with(limit=n)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        # como el SDK: cada order_by añade un criterio; "__name__" = id del documento
+        return self._with(order=self._order + [(field, direction)])
+
+    def start_after(self, values: Any) -> "FakeQuery":
+        # dict {campo: valor} o snapshot, como el SDK
+        return self._with(start_after=values)
+
+    def select(self, field_paths) -> "FakeQuery":
+        return self._with(fields=list(field_paths))
+
+    def on_snapshot(self, callback: Callable) -> "FakeWatch":
+        # solo cambios de docs que cumplen los filtros (sin snapshot inicial)
+        def _filtered(snaps, changes, read_time) -> None:
+            changes = [c for c in changes
+                       if c.type.name == "REMOVED" or self._match(c.document.to_dict() or {})]
+            if changes:
+                callback([c.document for c in changes], changes, read_time)
+
+        self._col._listeners.append(_filtered)
+        return FakeWatch(self._col, _filtered)
+
+    def _match(self, data: Dict[str, Any]) -> bool:
+        for field, op, value in self._filters:
+            v = data.get(field)
+            if op == "==" and v != value:
+                return False
+            if op == "in" and v not in value:
+                return False
+            if op == "array_contains" and value not in (v or []):
+                return False
+            if op in (">", ">=", "<", "<=") and (v is None or not _COMPARE[op](v, value)):
+                return False
+        return True
+
+    def stream(self, *args, **kwargs):
+        self._col._db._tick("queries")
+        rows = [(doc_id, data) for doc_id, data in list(self._col._docs.items()) if self._match(data)]
+        if self._order:
+            fields = [f for f, _ in self._order]
+            descending = self._order[0][1] == "DESCENDING"  # una sola dirección basta aquí
+            # Firestore omite docs sin el campo
+            rows = [r for r in rows if all(f == "__name__" or r[1].get(f) is not None for f in fields)]
+            key = lambda r: tuple(r[0] if f == "__name__" else r[1][f] for f in fields)  # noqa: E731
+            rows.sort(key=key, reverse=descending)
+            if self._start_after is not None:
+                sa = self._start_after
+                if isinstance(sa, FakeSnapshot):
+                    cursor = tuple(sa.id if f == "__name__" else sa.get(f) for f in fields)
+                elif isinstance(sa, dict):
+                    cursor = tuple(sa[f] for f in fields)
+                else:
+                    cursor = (sa,)
+                n = len(cursor)
+                after = (lambda v: v < cursor) if descending else (lambda v: v > cursor)
+                rows = [r for r in rows if after(key(r)[:n])]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        out: List[FakeSnapshot] = []
+        for doc_id, data in rows:
+            if self._fields is not None:
+                data = {k: data[k] for k in self._fields if k in data}
+            out.append(FakeSnapshot(FakeDocumentRef(self._col, doc_id), data))
+        return iter(out)
+
+    def get(self, *args, **kwargs) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db: "FakeFirestore", name: str):
+        super().__init__(self)
+        self._db = db
+        self.id = name
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable] = []
+
+    def document(self, doc_id: str) -> FakeDocumentRef:
+        return FakeDocumentRef(self, doc_id)
+
+    def on_snapshot(self, callback: Callable) -> FakeWatch:
+        self._listeners.append(callback)
+        return FakeWatch(self, callback)
+
+    def _write(self, doc_id: str, data: Dict[str, Any], merge: bool) -> None:
+        with self._db._lock:
+            existed = doc_id in self._docs
+            base = dict(self._docs.get(doc_id, {})) if merge else {}
+            base.update(copy.deepcopy(data))
+            self._docs[doc_id] = base
+        self._notify(doc_id, "MODIFIED" if existed else "ADDED")
+
+    def _delete(self, doc_id: str) -> None:
+        with self._db._lock:
+            existed = self._docs.pop(doc_id, None) is not None
+        if existed:
+            self._notify(doc_id, "REMOVED")
+
+    def _notify(self, doc_id: str, kind: str) -> None:
+        if not self._listeners:
+            return
+        snap = FakeSnapshot(FakeDocumentRef(self, doc_id), self._docs.get(doc_id))
+        change = SimpleNamespace(type=SimpleNamespace(name=kind), document=snap)
+        for cb in list(self._listeners):
+            cb([snap], [change], time.time())
+
+
+class FakeTransaction:
+    """Acumula escrituras y las aplica al commit (run_transaction serializa con un lock)."""
+
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._ops: List[tuple] = []
+
+    def set(self, ref: FakeDocumentRef, data: Dict[str, Any], merge: bool = False) -> None:
+        self._ops.append(("set", ref, data, merge))
+
+    def update(self, ref: FakeDocumentRef, data: Dict[str, Any]) -> None:
+        self._ops.append(("update", ref, data, True))
+
+    def delete(self, ref: FakeDocumentRef) -> None:
+        self._ops.append(("delete", ref, None, False))
+
+    def _commit(self) -> None:
+        if self._ops:
+            self._db._tick("commits")
+        for kind, ref, data, merge in self._ops:
+            if kind == "delete":
+                ref._col._delete(ref.id)
+            else:
+                ref._col._write(ref.id, data, merge=merge)
+        self._ops.clear()
+
+
+class FakeWriteBatch(FakeTransaction):
+    def commit(self) -> None:
+        self._commit()
+
+
+class FakeFirestore:
+    """
+    Cliente Firestore en memoria. `latency_ms` simula el RTT de cada operación
+    y `calls` cuenta lecturas/escrituras/queries para comparar variantes.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: Dict[str, int] = {"reads": 0, "writes": 0, "queries": 0, "commits": 0}
+        self._collections: Dict[str, FakeCollection] = {}
+        self._lock = threading.RLock()
+
+    def _tick(self, kind: str) -> None:
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def collection(self, name: str) -> FakeCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(self, name)
+            return self._collections[name]
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def get_all(self, refs, *args, **kwargs):
+        refs = list(refs)
+        if refs:
+            self._tick("reads")
+        for ref in refs:
+            yield FakeSnapshot(ref, ref._col._docs.get(ref.id))
+
+    def run_transaction(self, fn: Callable[[FakeTransaction], Any]) -> Any:
+        # Hook usado por users_repo._run_transaction en lugar de firestore.transactional
+        with self._lock:
+            tx = FakeTransaction(self)
+            result = fn(tx)
+            tx._commit()
+            return result
+
+    def reset_calls(self) -> None:
+        self.calls = {k: 0 for k in self.calls}
+
+
+class FakeUserNotFoundError(Exception):
+    pass
+
+
+class FakeFirebaseAuth:
+    """Doble de firebase_admin.auth (get_user/update_user/create_user) con latencia simulada."""
+
+    UserNotFoundError = FakeUserNotFoundError
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: Dict[str, int] = {"get_user": 0, "update_user": 0, "create_user": 0}
+        self.users: Dict[str, SimpleNamespace] = {}
+        self._lock = threading.Lock()
+
+    def _tick(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def get_user(self, uid: str, app=None) -> SimpleNamespace:
+        self._tick("get_user")
+        user = self.users.get(uid)
+        if user is None:
+            raise FakeUserNotFoundError(uid)
+        return user
+
+    def update_user(self, uid: str, app=None, **fields) -> SimpleNamespace:
+        self._tick("update_user")
+        if uid not in self.users:
+            raise FakeUserNotFoundError(uid)
+        for k, v in fields.items():
+            setattr(self.users[uid], k, v)
+        return self.users[uid]
+
+    def create_user(self, uid: str, app=None, **fields) -> SimpleNamespace:
+        self._tick("create_user")
+        user = SimpleNamespace(uid=uid, **fields)
+        self.users[uid] = user
+        return user
+
+    def reset_calls(self) -> None:
+        self.calls = {k: 0 for k in self.calls}
+
+
+def install_fake_auth(fa: Optional[FakeFirebaseAuth] = None) -> FakeFirebaseAuth:
+    """Inyecta el fake en app.firebase para que get_auth() lo devuelva."""
+    from app import firebase
+
+    fa = fa or FakeFirebaseAuth()
+    firebase.override_clients(auth=fa)
+    return fa
+
+
+def install_fake_firestore(fs: Optional[FakeFirestore] = None) -> FakeFirestore:
+    """Inyecta el fake en app.firebase para que get_firestore() lo devuelva."""
+    from app import firebase
+
+    fs = fs or FakeFirestore()
+    firebase.override_clients(firestore=fs)
+    return fs
@@ -0,0 +1,271 @@
+# bench/loadtest.py
+"""
+Prueba de carga offline del servicio completo (ASGI en proceso, sin red):
+  - Google  -> StubOIDCProvider (discovery, JWKS, token, userinfo; id_tokens RS256 reales)
+  - Firebase -> FakeFirestore / FakeFirebaseAuth inyectados vía app.firebase.override_clients
+
+Escenarios: callback (/auth/google/callback), me (/auth/me), roles_set (/auth/roles/set).
+Reporta throughput y p50/p95/p99 por escenario y compara contra bench/baselines.json.
+
+Uso (desde fastapi-oauth/):
+    python -m bench.loadtest --concurrency 16 --requests 2000 --latency-ms 2
+    python -m bench.loadtest --save-baseline            # actualiza bench/baselines.json
+    python -m bench.loadtest --compare --tolerance 0.25 # exit 1 si hay regresión
+
+bench/baselines.json trae una referencia (comando, plataforma y nº de CPUs en cada
+entrada). Las cifras dependen de la máquina: en otro entorno, regraba con --save-baseline
+antes de comparar. --compare con un escenario sin baseline termina con exit 1.
+Dependencias extra del stub (python-multipart): pip install -r requirements-dev.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+SCENARIOS = ("callback", "me", "roles_set")
+
+BENCH_HOST = "http://bench"
+STUB_ISSUER = "http://stub-oidc"
+CLIENT_ID = "bench-client"
+
+
+async def _wait_ready(client, timeout: float = 30.0) -> None:
+    # El warm-up del lifespan corre en segundo plano: no medir hasta que /ready dé 200
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        resp = await client.get("/ready")
+        if resp.status_code == 200:
+            return
+        await asyncio.sleep(0.05)
+    raise RuntimeError(f"app not ready after {timeout}s: {resp.json()}")
+
+
+def _configure_env() -> None:
+    # Debe correr antes de importar app.*: Settings lee el entorno al importar
+    os.environ.setdefault("GOOGLE_CLIENT_ID", CLIENT_ID)
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "bench-secret")
+    os.environ.setdefault("GOOGLE_REDIRECT_URI", f"{BENCH_HOST}/auth/google/callback")
+    os.environ.setdefault("GOOGLE_DISCOVERY_URL", f"{STUB_ISSUER}/.well-known/openid-configuration")
+    os.environ["OIDC_PREFETCH"] = "false"  # se precarga abajo contra el stub
+    os.environ.setdefault("USERS_BACKEND", "firestore")
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    idx = min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))
+    return samples[idx]
+
+
+def _summary(name: str, concurrency: int, samples: List[float], elapsed: float,
+             errors: Counter, calls: Dict[str, int]) -> Dict[str, Any]:
+    samples.sort()
+    n = len(samples)
+    total = n + sum(errors.values())
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(n / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+        "errors": dict(errors),
+        "backend_calls_per_req": {k: round(v / total, 2) for k, v in calls.items() if v} if total else {},
+    }
+
+
+# ── Driver genérico ──────────────────────────────────────────────────────────
+Op = Callable[[Any, int], Awaitable[Tuple[int, float]]]
+
+
+async def _drive(name: str, op: Op, clients: List[Any], total: int, fakes) -> Dict[str, Any]:
+    """Reparte `total` operaciones entre len(clients) workers concurrentes."""
+    samples: List[float] = []
+    errors: Counter = Counter()
+    pending = iter(range(total))
+    for f in fakes:
+        f.reset_calls()
+
+    async def worker(client) -> None:
+        for i in pending:  # iterador compartido: cada worker toma la siguiente operación
+            try:
+                status, dt = await op(client, i)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                continue
+            if status >= 400:
+                errors[str(status)] += 1
+            else:
+                samples.append(dt)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(c) for c in clients))
+    elapsed = time.perf_counter() - t0
+    calls: Counter = Counter()
+    for f in fakes:
+        calls.update(f.calls)
+    return _summary(name, len(clients), samples, elapsed, errors, calls)
+
+
+# ── Escenarios ───────────────────────────────────────────────────────────────
+async def _google_login(client, stub, sub: str) -> Tuple[int, float, Dict[str, Any]]:
+    """login -> code del stub -> callback. Solo se mide el callback."""
+    resp = await client.get("/auth/google/login")
+    query = parse_qs(urlparse(resp.headers["location"]).query)
+    code = stub.issue_code(sub, nonce=query.get("nonce", [None])[0])
+    t0 = time.perf_counter()
+    resp = await client.get("/auth/google/callback", params={"code": code, "state": query["state"][0]})
+    dt = time.perf_counter() - t0
+    return resp.status_code, dt, (resp.json() if resp.status_code == 200 else {})
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    _configure_env()
+    import httpx
+
+    from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore
+    from bench.stub_oidc import StubOIDCProvider
+
+    fs = install_fake_firestore(FakeFirestore(latency_ms=args.latency_ms))
+    fa = install_fake_auth(FakeFirebaseAuth(latency_ms=args.latency_ms))
+    stub = StubOIDCProvider(issuer=STUB_ISSUER, client_id=CLIENT_ID)
+
+    from app import http_client
+    from app.main import app
+    from app.oidc import google_oidc
+    from app.routers.auth import google_client
+
+    # El cliente saliente compartido (que lifespan inyecta en Authlib) habla con el stub
+    http_client.start(inner=httpx.ASGITransport(app=stub.app))
+    app_transport = httpx.ASGITransport(app=app)
+    rnd = random.Random(args.seed)
+    subs = [f"lt-{i}" for i in range(args.users)]
+    results: List[Dict[str, Any]] = []
+
+    async with app.router.lifespan_context(app):
+        clients = [httpx.AsyncClient(transport=app_transport, base_url=BENCH_HOST)
+                   for _ in range(args.concurrency)]
+        try:
+            await _wait_ready(clients[0])
+            await google_oidc.start(google_client(), client=http_client.get_client())
+            # Siembra: un login por usuario (el primero queda como HR_ADMIN por bootstrap)
+            tokens: Dict[str, str] = {}
+            for sub in subs:
+                status, _, body = await _google_login(clients[0], stub, sub)
+                if status != 200:
+                    raise RuntimeError(f"seed login failed for {sub}: HTTP {status}")
+                tokens[sub] = body["token"]["access_token"]
+            admin_headers = {"Authorization": f"Bearer {tokens[subs[0]]}"}
+            targets = subs[1:] or subs
+
+            async def op_callback(client, i):
+                status, dt, _ = await _google_login(client, stub, rnd.choice(subs))
+                return status, dt
+
+            async def op_me(client, i):
+                headers = {"Authorization": f"Bearer {tokens[rnd.choice(subs)]}"}
+                t0 = time.perf_counter()
+                resp = await client.get("/auth/me", headers=headers)
+                return resp.status_code, time.perf_counter() - t0
+
+            async def op_roles_set(client, i):
+                payload = {"uid": rnd.choice(targets), "roles": ["EMPLOYEE", "MANAGER"][: 1 + i % 2]}
+                t0 = time.perf_counter()
+                resp = await client.post("/auth/roles/set", json=payload, headers=admin_headers)
+                return resp.status_code, time.perf_counter() - t0
+
+            ops = {"callback": op_callback, "me": op_me, "roles_set": op_roles_set}
+            for name in args.scenarios:
+                results.append(await _drive(name, ops[name], clients, args.requests, (fs, fa, stub)))
+        finally:
+            for c in clients:
+                await c.aclose()
+            await google_oidc.stop()
+    return results
+
+
+# ── Baselines ────────────────────────────────────────────────────────────────
+def _key(r: Dict[str, Any]) -> str:
+    return f"{r['scenario']}@c{r['concurrency']}"
+
+
+def load_baselines() -> Dict[str, Any]:
+    if not BASELINES_PATH.is_file():
+        return {}
+    return json.loads(BASELINES_PATH.read_text() or "{}")
+
+
+def save_baselines(results: List[Dict[str, Any]]) -> None:
+    data = load_baselines()
+    meta = {"recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "command": "python -m " + __spec__.name + " " + " ".join(sys.argv[1:])}
+    for r in results:
+        data[_key(r)] = {**r, **meta}
+    BASELINES_PATH.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Regresión = p95/p99 más de `tolerance` por encima, o throughput más de `tolerance` por debajo.
+    Un escenario sin baseline también falla: el gate no puede pasar en vacío.
+    """
+    base = load_baselines()
+    problems = []
+    for r in results:
+        b = base.get(_key(r))
+        if b is None:
+            problems.append(f"{_key(r)}: no baseline in {BASELINES_PATH.name} (run --save-baseline)")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if b[metric] and r[metric] > b[metric] * (1 + tolerance):
+                problems.append(f"{_key(r)} {metric}: {b[metric]} -> {r[metric]}")
+        if b["throughput_rps"] and r["throughput_rps"] < b["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{_key(r)} throughput_rps: {b['throughput_rps']} -> {r['throughput_rps']}")
+        if r["errors"] and not b.get("errors"):
+            problems.append(f"{_key(r)} errors: {r['errors']}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenario", dest="scenarios", action="append", choices=SCENARIOS,
+                    help="repetible; por defecto todos")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=2000, help="por escenario")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=2.0, help="RTT simulado de Firestore/Firebase Auth")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--compare", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    results = asyncio.run(run(args))
+    for r in results:
+        print(json.dumps(r))
+    if args.save_baseline:
+        save_baselines(results)
+        print(f"baselines saved to {BASELINES_PATH}")
+    if args.compare:
+        problems = compare(results, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bench/stub_oidc.py
+"""
+Proveedor OIDC local para pruebas offline: discovery, JWKS, token y userinfo.
+Firma id_tokens reales (RS256) para que Authlib/jose los validen como los de Google.
+
+Uso:
+    stub = StubOIDCProvider()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub.app), base_url=stub.issuer)
+"""
+import secrets
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from authlib.jose import JsonWebKey, jwt
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class StubOIDCProvider:
+    def __init__(self, issuer: str = "http://stub-oidc", client_id: str = "bench-client",
+                 max_age: int = 3600, kid: str = "stub-1"):
+        self.issuer = issuer
+        self.client_id = client_id
+        self.max_age = max_age
+        self.key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": kid})
+        self.fail = False            # fuerza 500 en discovery/JWKS (probar last known-good)
+        self.hits: Counter = Counter()
+        self._codes: Dict[str, Dict[str, Any]] = {}
+        self._access: Dict[str, Dict[str, Any]] = {}
+        self.app = Starlette(routes=[
+            Route("/.well-known/openid-configuration", self._discovery),
+            Route("/jwks", self._jwks),
+            Route("/authorize", self._authorize),
+            Route("/token", self._token, methods=["POST"]),
+            Route("/userinfo", self._userinfo),
+        ])
+
+    # ── helpers ──────────────────────────────────────────────────────────────
+    @property
+    def calls(self) -> Counter:
+        # misma interfaz que los fakes de bench/fakes.py (loadtest suma llamadas por request)
+        return self.hits
+
+    def reset_calls(self) -> None:
+        self.hits.clear()
+
+    def rotate_key(self, kid: str) -> None:
+        self.key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": kid})
+
+    def claims_for(self, sub: str, **extra: Any) -> Dict[str, Any]:
+        return {
+            "sub": sub,
+            "email": extra.pop("email", f"{sub}@example.com"),
+            "email_verified": True,
+            "name": extra.pop("name", f"User {sub}"),
+            "given_name": "User",
+            "family_name": sub,
+            "picture": None,
+            **extra,
+        }
+
+    def issue_id_token(self, claims: Dict[str, Any], nonce: Optional[str] = None, ttl: int = 3600) -> str:
+        now = int(time.time())
+        payload = {**claims, "iss": self.issuer, "aud": self.client_id, "iat": now, "exp": now + ttl}
+        if nonce:
+            payload["nonce"] = nonce
+        header = {"alg": "RS256", "kid": self.key.kid}
+        return jwt.encode(header, payload, self.key).decode()
+
+    def issue_code(self, sub: str, nonce: Optional[str] = None, **extra: Any) -> str:
+        code = secrets.token_urlsafe(16)
+        self._codes[code] = {"claims": self.claims_for(sub, **extra), "nonce": nonce}
+        return code
+
+    # ── endpoints ────────────────────────────────────────────────────────────
+    async def _discovery(self, request: Request):
+        self.hits["discovery"] += 1
+        if self.fail:
+            return JSONResponse({"error": "unavailable"}, status_code=500)
+        return JSONResponse({
+            "issuer": self.issuer,
+            "authorization_endpoint": f"{self.issuer}/authorize",
+            "token_endpoint": f"{self.issuer}/token",
+            "userinfo_endpoint": f"{self.issuer}/userinfo",
+            "jwks_uri": f"{self.issuer}/jwks",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }, headers={"Cache-Control": f"public, max-age={self.max_age}"})
+
+    async def _jwks(self, request: Request):
+        self.hits["jwks"] += 1
+        if self.fail:
+            return JSONResponse({"error": "unavailable"}, status_code=500)
+        return JSONResponse({"keys": [self.key.as_dict(is_private=False)]},
+                            headers={"Cache-Control": f"public, max-age={self.max_age}"})
+
+    async def _authorize(self, request: Request):
+        self.hits["authorize"] += 1
+        return JSONResponse({"code": self.issue_code(request.query_params.get("login_hint", "stub-user"),
+                                                     nonce=request.query_params.get("nonce"))})
+
+    async def _token(self, request: Request):
+        self.hits["token"] += 1
+        form = await request.form()
+        entry = self._codes.pop(form.get("code", ""), None)
+        if entry is None:
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        access_token = secrets.token_urlsafe(16)
+        self._access[access_token] = entry["claims"]
+        return JSONResponse({
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "openid email profile",
+            "id_token": self.issue_id_token(entry["claims"], nonce=entry["nonce"]),
+        })
+
+    async def _userinfo(self, request: Request):
+        self.hits["userinfo"] += 1
+        token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        claims = self._access.get(token)
+        if claims is None:
+            return JSONResponse({"error": "invalid_token"}, status_code=401)
+        return JSONResponse(claims)
@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+"""
+Modo multi-worker: gunicorn + workers uvicorn con la app precargada en el master.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Los workers comparten las caches de principales y docs de usuario
+(SHARED_CACHE=true, app/shared_cache.py) y las métricas Prometheus
+(PROMETHEUS_MULTIPROC_DIR, por defecto /tmp/prometheus; solo con gunicorn). Firebase/Firestore se inicializan en el lifespan de
+cada worker, después del fork (los clientes gRPC no sobreviven a un fork).
+"""
+import glob
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True  # importa app.main una vez en el master (arranque y memoria compartida copy-on-write)
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # deja terminar el flush write-behind
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+os.environ.setdefault("SHARED_CACHE", "true")
+# Antes de importar app.main: prometheus_client elige el modo multiproceso al importarse
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def _reset_shared_state():
+    # Corre al cargar la config, antes de que preload_app importe app.main (que abre
+    # los segmentos): caches y métricas limpias, sin datos de un despliegue anterior.
+    from app.shared_cache import shared_cache_path
+
+    for name in ("principal", "user_doc"):
+        try:
+            os.remove(shared_cache_path(name))
+        except FileNotFoundError:
+            pass
+    prom_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if prom_dir:
+        os.makedirs(prom_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(prom_dir, "*.db")):
+            os.remove(path)
+
+
+_reset_shared_state()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,41 @@
+# scripts/generate_jwt_key.py
+"""
+Genera una llave de firma para JWT_KEYS_DIR.
+
+Uso (desde fastapi-oauth/):
+    python -m scripts.generate_jwt_key secrets/jwt 2025-01 --alg RS256
+Luego publica la llave (queda en el JWKS) y, cuando los consumidores la tengan
+cacheada, actívala con JWT_ACTIVE_KID=2025-01.
+"""
+import argparse
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("keys_dir")
+    ap.add_argument("kid")
+    ap.add_argument("--alg", choices=["RS256", "ES256"], default="RS256")
+    args = ap.parse_args()
+
+    if args.alg == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    out = Path(args.keys_dir) / f"{args.kid}.pem"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(pem)
+    out.chmod(0o600)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
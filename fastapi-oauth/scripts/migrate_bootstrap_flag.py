@@ -0,0 +1,18 @@
+# scripts/migrate_bootstrap_flag.py
+"""
+Siembra system/bootstrap.admin_bootstrapped para despliegues que ya tienen usuarios.
+
+Uso (desde fastapi-oauth/, con las credenciales de Firebase configuradas en .env):
+    python -m scripts.migrate_bootstrap_flag
+"""
+from app.firebase import init_firebase
+from app.repos.users_repo import migrate_bootstrap_flag
+
+
+def main() -> None:
+    init_firebase()
+    print(migrate_bootstrap_flag())
+
+
+if __name__ == "__main__":
+    main()
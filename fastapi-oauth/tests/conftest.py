@@ -0,0 +1,22 @@
+# tests/conftest.py
+"""Cada test arranca con caches vacías y sin el flag de bootstrap de un test anterior."""
+import os
+
+# Antes de importar app.*: Settings lee el entorno al importar
+os.environ.setdefault("REVOCATION_STORE", "memory")
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+os.environ.setdefault("OIDC_PREFETCH", "false")
+os.environ.setdefault("USERS_BACKEND", "firestore")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    from app import deps
+    from app.repos import firestore_users, users_repo
+
+    monkeypatch.setattr(firestore_users, "_admin_bootstrapped", False)
+    for cache in (users_repo.user_doc_cache, deps.principal_cache, deps.claims_cache):
+        cache.clear()
+    yield
@@ -0,0 +1,39 @@
+# tests/test_admission.py
+"""
+Control de admisión: configuración inválida falla al cargar, y un cliente sin tokens
+recibe un Retry-After finito.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import asyncio
+import math
+
+import pytest
+
+from app.admission import AdmissionController, Shed
+
+
+def _controller(**overrides) -> AdmissionController:
+    params = dict(max_concurrency=4, min_concurrency=1, queue_size=0, queue_timeout=1.0,
+                  client_rate=0.5, client_burst=1, target_latency=1.0, max_loop_lag=1.0, retry_after=2)
+    return AdmissionController(**{**params, **overrides})
+
+
+def test_zero_client_rate_is_rejected_at_config_load():
+    with pytest.raises(RuntimeError):
+        _controller(client_rate=0)
+
+
+def test_client_rate_shed_has_finite_retry_after():
+    controller = _controller()
+
+    async def scenario():
+        controller.release(await controller.acquire("10.0.0.1"))
+        with pytest.raises(Shed) as exc:
+            await controller.acquire("10.0.0.1")
+        return exc.value
+
+    shed = asyncio.run(scenario())
+    assert shed.reason == "client_rate"
+    assert math.isfinite(shed.retry_after) and 0 < shed.retry_after <= 2
@@ -0,0 +1,36 @@
+# tests/test_claims_auth.py
+"""
+current_user_from_claims: con roles_version por delante del token se relee el doc;
+si ese doc está inactivo (o ya no existe) se rechaza con 401, como en el camino lento.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app import deps
+from app.security import create_access_token, user_claims
+
+
+@pytest.mark.parametrize("fresh", [{"roles": ["MANAGER"], "roles_version": 2, "active": False}, None])
+def test_stale_roles_version_rejects_inactive_or_missing_user(fresh, monkeypatch):
+    token = create_access_token(user_claims("u1", {"roles": ["EMPLOYEE"], "roles_version": 1}))
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    monkeypatch.setattr(deps, "peek_user_doc", lambda uid: {"roles": ["MANAGER"], "roles_version": 2})
+    monkeypatch.setattr(deps, "get_user_doc", lambda uid: fresh)
+
+    with pytest.raises(HTTPException) as exc:
+        deps.current_user_from_claims(creds)
+    assert exc.value.status_code == 401
+
+
+def test_stale_roles_version_uses_fresh_roles(monkeypatch):
+    token = create_access_token(user_claims("u1", {"roles": ["EMPLOYEE"], "roles_version": 1}))
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    doc = {"roles": ["MANAGER"], "roles_version": 2, "active": True}
+    monkeypatch.setattr(deps, "peek_user_doc", lambda uid: doc)
+    monkeypatch.setattr(deps, "get_user_doc", lambda uid: doc)
+
+    assert deps.current_user_from_claims(creds).roles == ["MANAGER"]
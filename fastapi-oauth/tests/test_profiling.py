@@ -0,0 +1,44 @@
+# tests/test_profiling.py
+"""
+Profiler: spans de tareas concurrentes de la misma request (asyncio.gather) y de hilos
+de run_blocking anidan bajo su propio padre, no bajo el span abierto por otra tarea.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import asyncio
+import time
+
+from app import profiling
+from app.executor import run_blocking
+
+
+def test_concurrent_spans_keep_their_own_depth():
+    trace = profiling.Trace()
+
+    async def branch(name: str, delay: float):
+        with profiling.span(f"{name}.outer"):
+            await asyncio.sleep(delay)
+            with profiling.span(f"{name}.inner"):
+                await asyncio.sleep(0.01)
+
+    def blocking():
+        with profiling.span("thread.outer"):
+            with profiling.span("thread.inner"):
+                time.sleep(0.01)
+
+    async def scenario():
+        token = profiling._current.set(trace)
+        try:
+            with profiling.span("request"):
+                await asyncio.gather(branch("a", 0.0), branch("b", 0.005),
+                                     run_blocking("profiling", blocking))
+        finally:
+            profiling._current.reset(token)
+
+    asyncio.run(scenario())
+    depths = {name: depth for name, _, _, depth in trace.spans}
+    assert depths["request"] == 0
+    for name in ("a", "b", "thread"):
+        assert depths[f"{name}.outer"] == 1
+        assert depths[f"{name}.inner"] == 2
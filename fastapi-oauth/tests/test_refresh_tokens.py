@@ -0,0 +1,122 @@
+# tests/test_refresh_tokens.py
+"""
+Refresh tokens: rotación, detección de reuso (revoca la familia), expiración y logout
+contra POST /auth/token/refresh y /auth/logout (store en memoria, REFRESH_TOKEN_STORE=memory),
+más la revocación por lotes y el expire_at del store de Firestore (bench/fakes.py).
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("REVOCATION_STORE", "memory")
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+os.environ.setdefault("OIDC_PREFETCH", "false")
+os.environ.setdefault("USERS_BACKEND", "firestore")
+
+import httpx  # noqa: E402
+
+from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore  # noqa: E402
+
+
+async def _login(client: httpx.AsyncClient, sub: str) -> dict:
+    from app.routers import auth as auth_router
+
+    async def fake_authorize_access_token(request, **kwargs):
+        return {"access_token": f"at-{sub}", "id_token": "stub",
+                "userinfo": {"sub": sub, "email": f"{sub}@example.com", "name": f"User {sub}",
+                             "given_name": "User", "family_name": sub, "email_verified": True}}
+
+    auth_router.google_client().authorize_access_token = fake_authorize_access_token
+    r = await client.get("/auth/google/callback")
+    assert r.status_code == 200, r.text
+    return r.json()["token"]
+
+
+def _run(scenario) -> None:
+    install_fake_firestore(FakeFirestore())
+    install_fake_auth(FakeFirebaseAuth())
+    from app.main import app
+
+    async def _main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await scenario(client)
+
+    asyncio.run(_main())
+
+
+def _refresh(client: httpx.AsyncClient, refresh_token: str):
+    return client.post("/auth/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_rotation_and_reuse_revokes_family():
+    async def scenario(client):
+        first = (await _login(client, "rot"))["refresh_token"]
+
+        r = await _refresh(client, first)
+        assert r.status_code == 200, r.text
+        second = r.json()["refresh_token"]
+        assert second != first
+
+        # reuso del token ya rotado => 401 y toda la familia revocada
+        r = await _refresh(client, first)
+        assert r.status_code == 401, r.text
+        assert (await _refresh(client, second)).status_code == 401
+
+    _run(scenario)
+
+
+def test_expired_refresh_token_is_rejected():
+    from app import refresh_tokens
+
+    async def scenario(client):
+        token = (await _login(client, "exp"))["refresh_token"]
+        rec = refresh_tokens.refresh_store.get(refresh_tokens._hash(token))
+        rec.expires_at = int(time.time()) - 1
+        refresh_tokens.refresh_store.put(rec)
+
+        assert (await _refresh(client, token)).status_code == 401
+
+    _run(scenario)
+
+
+def test_refresh_after_logout_is_rejected():
+    async def scenario(client):
+        token = await _login(client, "out")
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+        r = await client.post("/auth/logout", json={"refresh_token": token["refresh_token"]}, headers=headers)
+        assert r.status_code == 204, r.text
+        assert (await _refresh(client, token["refresh_token"])).status_code == 401
+
+    _run(scenario)
+
+
+def test_firestore_family_revocation_is_chunked_and_rotated_tokens_expire(monkeypatch):
+    from app import refresh_tokens
+    from app.config import settings
+
+    fs = install_fake_firestore(FakeFirestore())
+    monkeypatch.setattr(refresh_tokens, "refresh_store", refresh_tokens.FirestoreRefreshStore())
+
+    token = refresh_tokens.issue_refresh_token("fam")
+    rotated = []
+    for _ in range(1200):
+        rotated.append(token)
+        _, token = refresh_tokens.rotate_refresh_token(token)
+
+    col = fs.collection(settings.firestore_refresh_collection)
+    window_end = datetime.fromtimestamp(time.time() + settings.refresh_reuse_detection_days * 86400,
+                                        tz=timezone.utc)
+    used = col.document(refresh_tokens._hash(rotated[0])).get().to_dict()
+    assert used["used"] and used["expire_at"] <= window_end
+    current = col.document(refresh_tokens._hash(token)).get().to_dict()
+    assert current["expire_at"] == datetime.fromtimestamp(current["expires_at"], tz=timezone.utc)
+
+    fs.reset_calls()
+    refresh_tokens.revoke_refresh_token(token)
+    assert fs.calls["commits"] == 3  # 1201 docs en lotes de <= 500
+    assert all(snap.get("revoked") for snap in col.where("family_id", "==", used["family_id"]).stream())
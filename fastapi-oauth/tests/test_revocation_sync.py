@@ -0,0 +1,42 @@
+# tests/test_revocation_sync.py
+"""
+Sync de la deny-list entre workers: un revoke_user_tokens masivo comparte created_at
+y ocupa varias páginas; ningún evento se puede perder en el salto de página.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import os
+import time
+
+os.environ.setdefault("REVOCATION_STORE", "memory")
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+os.environ.setdefault("OIDC_PREFETCH", "false")
+
+import pytest  # noqa: E402
+
+from bench.fakes import FakeFirestore, install_fake_firestore  # noqa: E402
+
+
+@pytest.mark.parametrize("store", ["memory", "firestore"])
+def test_same_timestamp_events_cross_page_boundary(store, monkeypatch):
+    from app import revocation
+
+    install_fake_firestore(FakeFirestore())
+    backend = (revocation.InMemoryRevocationStore() if store == "memory"
+               else revocation.FirestoreRevocationStore())
+    monkeypatch.setattr(revocation, "revocation_store", backend)
+    monkeypatch.setattr(revocation, "revocations", revocation.RevocationList())
+
+    issued_ms = int(time.time() * 1000) - 1
+    uids = [f"u{i}" for i in range(1200)]
+    revocation.revoke_user_tokens(uids)  # un solo created_at para los 1200 eventos
+
+    worker_b = revocation.RevocationList()
+    monkeypatch.setattr(revocation, "revocations", worker_b)
+    assert revocation.sync_revocations(page_size=500) == 1200
+    assert all(worker_b.is_revoked(uid, None, issued_ms) for uid in uids)
+
+    # un segundo sync no se queda atascado ni pierde nada
+    revocation.sync_revocations(page_size=500)
+    assert worker_b.is_revoked("u1199", None, issued_ms)
@@ -0,0 +1,22 @@
+# tests/test_shared_cache.py
+"""
+SharedSlotCache: un set() que no cabe en el slot no deja la versión anterior de la
+clave visible para los demás workers (dos instancias sobre el mismo fichero).
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+from app.shared_cache import SharedSlotCache
+
+
+def test_oversize_set_invalidates_previous_value(tmp_path):
+    path = str(tmp_path / "auth-test.cache")
+    worker_a = SharedSlotCache(path, slots=16, slot_size=256, ttl_seconds=60)
+    worker_b = SharedSlotCache(path, slots=16, slot_size=256, ttl_seconds=60)
+
+    worker_a.set("u1", {"roles": ["EMPLOYEE"]})
+    assert worker_b.get("u1") == {"roles": ["EMPLOYEE"]}
+
+    worker_a.set("u1", {"roles": ["HR_ADMIN"], "bio": "x" * 1024})
+    assert worker_a.oversize == 1
+    assert worker_b.get("u1") is None
@@ -0,0 +1,41 @@
+# tests/test_user_cache_expiry.py
+"""
+El atajo de login (perfil sin cambios y doc en cache) no renueva el TTL de la entrada:
+sin listener, un cambio de roles hecho por otra réplica se ve al vencer el TTL aunque
+el usuario siga entrando más a menudo que eso.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import os
+import time
+
+os.environ.setdefault("REVOCATION_STORE", "memory")
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+os.environ.setdefault("OIDC_PREFETCH", "false")
+os.environ.setdefault("USERS_BACKEND", "firestore")
+
+from bench.fakes import FakeFirestore, install_fake_firestore  # noqa: E402
+
+
+def test_fast_path_login_does_not_extend_cache_ttl(monkeypatch):
+    from app.cache import TTLCache
+    from app.config import settings
+    from app.repos import users_repo
+
+    fs = install_fake_firestore(FakeFirestore())
+    monkeypatch.setattr(users_repo, "user_doc_cache", TTLCache(max_size=100, ttl_seconds=0.5))
+    profile = {"sub": "u1", "email": "u1@example.com", "given_name": "U", "family_name": "One"}
+
+    users_repo.create_or_update_from_google(profile, "u1")
+    # cambio remoto (otra réplica, sin on_snapshot en este worker)
+    fs.collection(settings.firestore_users_collection).document("u1").update({"roles": ["MANAGER"]})
+
+    deadline = time.monotonic() + 2.0
+    roles = None
+    while time.monotonic() < deadline:
+        roles = users_repo.create_or_update_from_google(profile, "u1")["roles"]
+        if roles == ["MANAGER"]:
+            break
+        time.sleep(0.3)  # más frecuente que el TTL
+    assert roles == ["MANAGER"]
@@ -0,0 +1,77 @@
+# tests/test_user_deactivation.py
+"""
+Una baja (PUT /auth/users/{uid}/active) no se deshace con el siguiente login de Google:
+deactivate -> /auth/me 401 -> /auth/google/callback 403 y el doc sigue inactivo.
+
+Firestore/Firebase Auth en memoria (bench/fakes.py); Google se sustituye por claims fijos.
+
+Uso (desde fastapi-oauth/):
+    python -m pytest tests -q
+"""
+import asyncio
+import os
+
+# Antes de importar app.*: Settings lee el entorno al importar
+os.environ.setdefault("REVOCATION_STORE", "memory")
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+os.environ.setdefault("OIDC_PREFETCH", "false")
+os.environ.setdefault("USERS_BACKEND", "firestore")
+
+import httpx  # noqa: E402
+
+from bench.fakes import FakeFirebaseAuth, FakeFirestore, install_fake_auth, install_fake_firestore  # noqa: E402
+
+
+def _claims(sub: str) -> dict:
+    return {"sub": sub, "email": f"{sub}@example.com", "name": f"User {sub}",
+            "given_name": "User", "family_name": sub, "email_verified": True}
+
+
+async def _scenario() -> None:
+    install_fake_firestore(FakeFirestore())
+    install_fake_auth(FakeFirebaseAuth())
+
+    from app.main import app
+    from app.routers import auth as auth_router
+
+    next_sub = {"value": None}
+
+    async def fake_authorize_access_token(request, **kwargs):
+        sub = next_sub["value"]
+        return {"access_token": f"at-{sub}", "id_token": "stub", "userinfo": _claims(sub)}
+
+    auth_router.google_client().authorize_access_token = fake_authorize_access_token
+
+    async def login(client, sub):
+        next_sub["value"] = sub
+        return await client.get("/auth/google/callback")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        r = await login(client, "admin")  # primer usuario => HR_ADMIN (bootstrap)
+        assert r.status_code == 200, r.text
+        admin = {"Authorization": f"Bearer {r.json()['token']['access_token']}"}
+
+        r = await login(client, "employee")
+        assert r.status_code == 200, r.text
+        employee = {"Authorization": f"Bearer {r.json()['token']['access_token']}"}
+        assert (await client.get("/auth/me", headers=employee)).status_code == 200
+
+        r = await client.put("/auth/users/employee/active", json={"active": False}, headers=admin)
+        assert r.status_code == 200, r.text
+        assert r.json()["active"] is False
+
+        # tokens previos revocados
+        assert (await client.get("/auth/me", headers=employee)).status_code == 401
+
+        # un nuevo login de Google no reactiva la cuenta ni emite tokens
+        r = await login(client, "employee")
+        assert r.status_code == 403, r.text
+        assert "token" not in r.json()
+
+        r = await client.get("/auth/users/employee", headers=admin)
+        assert r.status_code == 200, r.text
+        assert r.json()["active"] is False
+
+
+def test_deactivated_user_cannot_log_back_in():
+    asyncio.run(_scenario())